@@ -0,0 +1,259 @@
+import json
+import os
+import re
+import numpy as np
+
+# order of the values returned by DifficultyMetrics.avg_all_metrics
+metric_names = ["closestWall", "avgVisibility", "dispersion", "characteristic_dimension", "tortuosity"]
+
+index_file = "index.json"
+
+# arrays stored per chunk, each saved as <chunk>_<name>.npy:
+#   ids          (n,) world numbers
+#   seeds        (n,) world seeds
+#   grids        (n, rows, cols) obstacle maps
+#   cspaces      (n, rows, cols) jackal maps
+#   paths        (cells, 2) every path of the chunk back to back
+#   path_offsets (n + 1,) world i's path is paths[path_offsets[i]:path_offsets[i + 1]]
+#   metrics      (n, len(metric_names)) avg_all_metrics of every world
+#   relaxed      (n,) whether the path was found without the turn limit,
+#                see gen_world_ca.SearchStats; all False in stores written
+#                before it was kept
+chunk_arrays = ["ids", "seeds", "grids", "cspaces", "paths", "path_offsets", "metrics", "relaxed"]
+
+
+# appends worlds to a dataset stored as a few chunked .npy files per
+# chunk_size worlds plus an index.json, instead of separate files per world;
+# worlds are buffered in memory and written a chunk at a time, and opening
+# an existing store appends new chunks after the ones already there; the
+# index also records the robot radius the c-spaces were built for, when the
+# worlds appended give it, and a store only takes worlds of one radius
+class DatasetWriter():
+  def __init__(self, root, chunk_size=1024):
+    self.root = root
+    self.chunk_size = chunk_size
+    if not os.path.isdir(root):
+      os.makedirs(root)
+
+    index_path = os.path.join(root, index_file)
+    if os.path.exists(index_path):
+      with open(index_path) as f:
+        self.index = json.load(f)
+    else:
+      self.index = { "grid_shape" : None,
+                     "metric_names" : metric_names,
+                     "robot_radius" : None,
+                     "num_worlds" : 0,
+                     "chunks" : [] }
+
+    self._clearBuffer()
+
+  def _clearBuffer(self):
+    self.buffer = dict((name, []) for name in ["ids", "seeds", "grids", "cspaces", "paths", "metrics", "relaxed"])
+
+  def append(self, iteration, grid, cspace, path, metrics, seed=0, relaxed=False, robot_radius=None):
+    grid = np.asarray(grid, dtype=np.int8)
+    if self.index["grid_shape"] is None:
+      self.index["grid_shape"] = list(grid.shape)
+    elif list(grid.shape) != self.index["grid_shape"]:
+      raise ValueError("grid shape %s doesn't match the store's %s" % (grid.shape, tuple(self.index["grid_shape"])))
+
+    if robot_radius is not None:
+      if self.index.get("robot_radius") is None:
+        self.index["robot_radius"] = robot_radius
+      elif robot_radius != self.index["robot_radius"]:
+        raise ValueError("robot radius %d doesn't match the store's %d" % (robot_radius, self.index["robot_radius"]))
+
+    self.buffer["ids"].append(iteration)
+    self.buffer["seeds"].append(seed)
+    self.buffer["grids"].append(grid)
+    self.buffer["cspaces"].append(np.asarray(cspace, dtype=np.int8))
+    self.buffer["paths"].append(np.asarray(path, dtype=np.int32).reshape(-1, 2))
+    self.buffer["metrics"].append(np.asarray(metrics, dtype=np.float64))
+    self.buffer["relaxed"].append(bool(relaxed))
+
+    if len(self.buffer["ids"]) >= self.chunk_size:
+      self.flush()
+
+  # appends a world dict from gen_world_ca.generateWorld
+  def appendWorld(self, iteration, world):
+    self.append(iteration, world["obstacle_map"], world["jackal_map"], world["path"], world["metrics"], world["seed"], world.get("relaxed", False),
+                world.get("robot_radius"))
+
+  # writes the buffered worlds as a new chunk and updates the index
+  def flush(self):
+    num = len(self.buffer["ids"])
+    if num == 0:
+      return
+
+    path_lengths = [len(path) for path in self.buffer["paths"]]
+    arrays = { "ids" : np.asarray(self.buffer["ids"], dtype=np.int64),
+               "seeds" : np.asarray(self.buffer["seeds"], dtype=np.int64),
+               "grids" : np.stack(self.buffer["grids"]),
+               "cspaces" : np.stack(self.buffer["cspaces"]),
+               "paths" : np.concatenate(self.buffer["paths"]),
+               "path_offsets" : np.concatenate(([0], np.cumsum(path_lengths))).astype(np.int64),
+               "metrics" : np.stack(self.buffer["metrics"]),
+               "relaxed" : np.asarray(self.buffer["relaxed"], dtype=bool) }
+
+    name = "chunk_%05d" % len(self.index["chunks"])
+    for array_name in chunk_arrays:
+      np.save(os.path.join(self.root, "%s_%s.npy" % (name, array_name)), arrays[array_name])
+
+    self.index["chunks"].append({ "name" : name, "worlds" : num, "path_cells" : int(sum(path_lengths)) })
+    self.index["num_worlds"] += num
+    self._writeIndex()
+    self._clearBuffer()
+
+  def _writeIndex(self):
+    index_path = os.path.join(self.root, index_file)
+    with open(index_path + ".tmp", "w") as f:
+      json.dump(self.index, f)
+    os.rename(index_path + ".tmp", index_path)
+
+  def close(self):
+    self.flush()
+
+
+# appends every world of a directory written by gen_world_ca.saveWorld
+# (grid_files, cspace_files, path_files and metrics_files) to writer,
+# in order of world number; returns how many worlds were imported
+def importDirectory(src_root, writer):
+  grid_dir = os.path.join(src_root, "grid_files")
+  iterations = []
+  for filename in os.listdir(grid_dir):
+    match = re.match(r"grid_(-?\d+)\.npy$", filename)
+    if match:
+      iterations.append(int(match.group(1)))
+
+  imported = 0
+  for iteration in sorted(iterations):
+    files = [os.path.join(src_root, "grid_files", "grid_%d.npy" % iteration),
+             os.path.join(src_root, "cspace_files", "cspace_%d.npy" % iteration),
+             os.path.join(src_root, "path_files", "path_%d.npy" % iteration),
+             os.path.join(src_root, "metrics_files", "metrics_%d.npy" % iteration)]
+
+    # skip worlds that were only partly written
+    if not all(os.path.exists(filename) for filename in files):
+      continue
+
+    grid, cspace, path, metrics = [np.load(filename) for filename in files]
+    writer.append(iteration, grid, cspace, path, metrics)
+    imported += 1
+
+  writer.flush()
+  return imported
+
+
+# read-only access to a store written by DatasetWriter; every chunk array is
+# memory-mapped, so world(i) returns views into the files without copying and
+# only the pages actually touched are read
+class DatasetReader():
+  def __init__(self, root):
+    self.root = root
+    with open(os.path.join(root, index_file)) as f:
+      self.index = json.load(f)
+    self.metric_names = self.index["metric_names"]
+
+    self.chunks = []
+    for chunk in self.index["chunks"]:
+      arrays = {}
+      for array_name in chunk_arrays:
+        filename = os.path.join(root, "%s_%s.npy" % (chunk["name"], array_name))
+        if array_name == "relaxed" and not os.path.exists(filename):
+          arrays[array_name] = np.zeros(chunk["worlds"], dtype=bool)
+        else:
+          arrays[array_name] = np.load(filename, mmap_mode="r")
+      self.chunks.append(arrays)
+
+    # first global world number of every chunk
+    counts = [chunk["worlds"] for chunk in self.index["chunks"]]
+    self.chunk_starts = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+    self.positions = None
+    self.all_metrics = None
+
+  def __len__(self):
+    return int(self.chunk_starts[-1])
+
+  def __iter__(self):
+    for i in range(len(self)):
+      yield self.world(i)
+
+  # chunk arrays and row within the chunk of world i
+  def _locate(self, i):
+    if i < 0:
+      i += len(self)
+    if i < 0 or i >= len(self):
+      raise IndexError("world %d out of range for %d worlds" % (i, len(self)))
+
+    chunk = int(np.searchsorted(self.chunk_starts, i, side="right")) - 1
+    return self.chunks[chunk], i - int(self.chunk_starts[chunk])
+
+  # the i-th stored world as views: grid, cspace, path, metrics, id, seed,
+  # whether the path is relaxed and the store's robot radius (None if it
+  # wasn't recorded)
+  def world(self, i):
+    arrays, row = self._locate(i)
+    offsets = arrays["path_offsets"]
+    return { "id" : int(arrays["ids"][row]),
+             "seed" : int(arrays["seeds"][row]),
+             "grid" : arrays["grids"][row],
+             "cspace" : arrays["cspaces"][row],
+             "path" : arrays["paths"][offsets[row]:offsets[row + 1]],
+             "metrics" : arrays["metrics"][row],
+             "relaxed" : bool(arrays["relaxed"][row]),
+             "robot_radius" : self.index.get("robot_radius") }
+
+  # position in the store of the world saved under number world_id
+  def indexOf(self, world_id):
+    if self.positions is None:
+      self.positions = dict((world_id, i) for i, world_id in enumerate(self.ids().tolist()))
+
+    return self.positions[world_id]
+
+  def ids(self):
+    return np.concatenate([arrays["ids"] for arrays in self.chunks] + [np.zeros(0, dtype=np.int64)])
+
+  # (num_worlds, len(metric_names)) array of all metrics, read once
+  def metrics(self):
+    if self.all_metrics is None:
+      self.all_metrics = np.concatenate([arrays["metrics"] for arrays in self.chunks] + [np.zeros((0, len(self.metric_names)))])
+
+    return self.all_metrics
+
+  # positions of the worlds whose metrics fall in the given ranges, passed
+  # as metric_name=(low, high) with None for an open end, e.g.
+  # select(tortuosity=(1.0, 1.2), closestWall=(2.0, None))
+  def select(self, **ranges):
+    metrics = self.metrics()
+    keep = np.ones(len(metrics), dtype=bool)
+    for name, (low, high) in ranges.items():
+      if name not in self.metric_names:
+        raise ValueError("unknown metric %s, expected one of %s" % (name, ", ".join(self.metric_names)))
+
+      values = metrics[:, self.metric_names.index(name)]
+      if low is not None:
+        keep &= values >= low
+      if high is not None:
+        keep &= values <= high
+
+    return np.flatnonzero(keep)
+
+  # iterates the worlds matching select(**ranges)
+  def filter(self, **ranges):
+    for i in self.select(**ranges):
+      yield self.world(int(i))
+
+
+if __name__ == "__main__":
+  import argparse
+
+  parser = argparse.ArgumentParser(description="import a per-file dataset directory into a chunked store")
+  parser.add_argument("src", help="directory holding grid_files, cspace_files, path_files and metrics_files")
+  parser.add_argument("dst", help="store directory, appended to if it exists")
+  parser.add_argument("--chunk-size", type=int, default=1024)
+  args = parser.parse_args()
+
+  writer = DatasetWriter(args.dst, args.chunk_size)
+  print("imported %d worlds" % importDirectory(args.src, writer))
+  writer.close()
@@ -1,28 +1,82 @@
 import math
 import Queue
+import numpy as np
+import grid_ops
+
+# four cardinal, four diagonal, and one in between each (slope +- 1/2 or 2),
+# in order around the field of view
+dispersion_moves = [(0, 1), (1, 2), (1, 1), (2, 1), (1, 0), (2, -1), (1, -1), (1, -2), (0, -1), (-2, -1), (-1, -1), (-1, -2), (-1, 0), (-2, 1), (-1, 1), (-1, 2)]
+
+# ray cell offsets for each dispersion move, by radius
+dispersion_tables = {}
+
+# cells checked by _cellDispersion along each of the 16 moves,
+# counting the in-between axes as two steps
+def dispersion_table(radius):
+  if radius not in dispersion_tables:
+    table = []
+    for move in dispersion_moves:
+      step = 2 if move[0] == 2 or move[1] == 2 else 1
+      num_steps = (radius + step - 1) // step
+      table.append([(move[0] * k, move[1] * k) for k in range(1, num_steps + 1)])
+    dispersion_tables[radius] = table
+
+  return dispersion_tables[radius]
   
 class DifficultyMetrics:
   # radius used for density and dispersion
-  def __init__(self, map, path, radius):
+  # vectorized computes whole metric grids with array operations,
+  # otherwise every cell runs its own search
+  # features is a MapFeatures of the same map whose cached grids are used instead
+  def __init__(self, map, path, radius, vectorized=True, features=None):
     self.map = map
     self.rows = len(map)
     self.cols = len(map[0])
     self.axes = [(0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1)]
     self.path = path
     self.radius = radius
+    self.vectorized = vectorized
+    self.run_lengths = {}
+    self.integral_image = None
+    self.features = features
+    self.ray_memo = {}
+
+  # radius defaults to the one given at construction, all radii share one summed-area table
+  def density(self, radius=None):
+    if radius is None:
+      radius = self.radius
+
+    if self.features is not None:
+      return self.features.density(radius)
+
+    if self.vectorized:
+      return self._densityGrid(radius).tolist()
 
-  def density(self):
     dens = [[0 for i in range(self.cols)] for j in range(self.rows)]
     for r in range(self.rows):
       for c in range(self.cols):
         if self.map[r][c] == 0:
-          dens[r][c] = self._densityOfTile(r, c, self.radius)
+          dens[r][c] = self._densityOfTile(r, c, radius)
         else:
-          dens[r][c] = (self.radius * 2) ** 2
+          dens[r][c] = (radius * 2) ** 2
 
     return dens
 
+  # _densityOfTile for every open cell from the summed-area table, (radius * 2) ** 2 on walls
+  def _densityGrid(self, radius):
+    if self.integral_image is None:
+      self.integral_image = grid_ops.IntegralImage(self.map)
+
+    walls = np.asarray(self.map) == 1
+    return np.where(walls, (radius * 2) ** 2, self.integral_image.windowSums(radius))
+
   def closestWall(self):
+    if self.features is not None:
+      return self.features.closestWall()
+
+    if self.vectorized:
+      return self.distanceTransform().tolist()
+
     dists = [[0 for i in range(self.cols)] for j in range(self.rows)]
     for r in range(self.rows):
       for c in range(self.cols):
@@ -31,7 +85,24 @@ class DifficultyMetrics:
 
     return dists
 
+  # same values as _distToClosestWall for every cell, from one exact
+  # euclidean distance transform of the whole grid
+  def distanceTransform(self):
+    dists = grid_ops.distance_transform(self.map)
+
+    # no walls at all, use the same fallback as _distToClosestWall
+    if self.rows > 0 and self.cols > 0 and np.isinf(dists[0][0]):
+      dists[:] = (self.rows - 1) / 2
+
+    return dists
+
   def avgVisibility(self):
+    if self.features is not None:
+      return self.features.avgVisibility()
+
+    if self.vectorized:
+      return self._avgVisibilityGrid().tolist()
+
     vis = [[0 for i in range(self.cols)] for j in range(self.rows)]
     for r in range(self.rows):
       for c in range(self.cols):
@@ -41,15 +112,37 @@ class DifficultyMetrics:
 
   # calculates the number of changes betweeen open & wall
   # in its field of view (along 16 axes)
-  def dispersion(self):
+  def dispersion(self, radius=None):
+    if radius is None:
+      radius = self.radius
+
+    if self.features is not None:
+      return self.features.dispersion(radius)
+
+    if self.vectorized:
+      return self._dispersionGrid(radius).tolist()
+
     disp = [[0 for i in range(self.cols)] for j in range(self.rows)]
     for r in range(self.rows):
       for c in range(self.cols):
-        disp[r][c] = self._cellDispersion(r, c, self.radius)
+        disp[r][c] = self._cellDispersion(r, c, radius)
 
     return disp
 
+  # _cellDispersion for every cell, all 16 rays evaluated as array operations
+  def _dispersionGrid(self, radius):
+    axes_wall = grid_ops.rays_hit_walls(self.map, dispersion_table(radius))
+    change_count = (axes_wall != np.roll(axes_wall, -1, axis=0)).sum(axis=0)
+    return np.where(np.asarray(self.map) == 1, -1, change_count)
+
   def characteristic_dimension(self):
+    if self.features is not None:
+      return self.features.characteristic_dimension()
+
+    if self.vectorized:
+      widths = [self._axisWidthGrid(axis) for axis in self.axes[:4]]
+      return np.minimum.reduce(widths).tolist()
+
     cdr = [[0 for i in range(self.cols)] for j in range(self.rows)]
     for r in range(self.rows):
       for c in range(self.cols):
@@ -65,6 +158,9 @@ class DifficultyMetrics:
     return cdr
 
   def axis_width(self, axis):
+    if self.vectorized:
+      return self._axisWidthGrid(axis).tolist()
+
     width = [[0 for i in range(self.cols)] for j in range(self.rows)]
     for r in range(self.rows):
       for c in range(self.cols):
@@ -72,6 +168,33 @@ class DifficultyMetrics:
 
     return width
 
+  # open run length and wall hit along axis for every cell, swept once per axis
+  def _runLengths(self, axis):
+    if axis not in self.run_lengths:
+      self.run_lengths[axis] = grid_ops.run_lengths(self.map, axis)
+
+    return self.run_lengths[axis]
+
+  # _distance for every cell: the open runs along axis and its reverse
+  def _axisWidthGrid(self, axis):
+    runs, hits = self._runLengths(axis)
+    reverse_runs, reverse_hits = self._runLengths((axis[0] * -1, axis[1] * -1))
+    return np.where(np.asarray(self.map) == 1, -1, runs + reverse_runs)
+
+  # _avgVisCell for every cell, rays that run off the map aren't counted
+  def _avgVisibilityGrid(self):
+    open_cells = np.asarray(self.map) != 1
+    total_vis = np.zeros((self.rows, self.cols), dtype=np.int32)
+    num_axes = np.zeros((self.rows, self.cols), dtype=np.int32)
+    for axis in self.axes:
+      runs, hits = self._runLengths(axis)
+      # a wall cell sees nothing but counts every axis
+      counted = hits | ~open_cells
+      total_vis += np.where(counted & open_cells, runs + 1, 0)
+      num_axes += counted
+
+    return total_vis // np.maximum(num_axes, 1)
+
   # currently returns a value between 0 and board width/length - 1
   def _distance(self, r, c, axis):
     if self.map[r][c] == 1:
@@ -238,40 +361,189 @@ class DifficultyMetrics:
 
   # returns a list of all metrics, averaged over all points in path except for
   # tortuosity, which is not averaged over the path
-  def avg_all_metrics(self):
+  # lazy evaluates the metrics only on the distinct cells of the path, see _pathCellMetrics
+  def avg_all_metrics(self, lazy=False):
+    # read per-cell values from the shared feature grids if there are any,
+    # otherwise evaluate each path cell on its own
+    if lazy:
+      cell_metrics = self._pathCellMetrics()
+    elif self.features is not None:
+      dist_grid = self.features.closestWall()
+      vis_grid = self.features.avgVisibility()
+      disp_grid = self.features.dispersion(self.radius)
+      char_dim_grid = self.features.characteristic_dimension()
+      cell_metrics = [
+        lambda row, col: dist_grid[row][col],
+        lambda row, col: vis_grid[row][col],
+        lambda row, col: disp_grid[row][col],
+        lambda row, col: char_dim_grid[row][col],
+      ]
+    else:
+      char_dim_grid = self.characteristic_dimension()
+      cell_metrics = [
+        self._distToClosestWall,
+        self._avgVisCell,
+        lambda row, col: self._cellDispersion(row, col, self.radius),
+        lambda row, col: char_dim_grid[row][col],
+      ]
+
+    # closest wall, average visibility, dispersion and characteristic dimension
     result = []
-
-    # closest wall
-    total = 0.0
-    for row, col in self.path:
-      total += self._distToClosestWall(row, col)
-    avg = total / len(self.path)
-    result.append(avg)
-    
-    # average visibility
-    total = 0.0
-    for row, col in self.path:
-      total += self._avgVisCell(row, col)
-    avg = total / len(self.path)
-    result.append(avg)
-
-    # dispersion
-    total = 0.0
-    for row, col in self.path:
-      total += self._cellDispersion(row, col, self.radius)
-    avg = total / len(self.path)
-    result.append(avg)
-
-    # characteristic dimension
-    total = 0.0
-    char_dim_grid = self.characteristic_dimension()
-    for row, col in self.path:
-      total += char_dim_grid[row][col]
-    avg = total / len(self.path)
-    result.append(avg)
+    for cell_metric in cell_metrics:
+      total = 0.0
+      for row, col in self.path:
+        total += cell_metric(row, col)
+      avg = total / len(self.path)
+      result.append(avg)
 
     # tortuosity
     tort = self.tortuosity()
     result.append(tort)
 
     return result
+
+
+  # per-cell closest wall, visibility, dispersion and characteristic dimension
+  # for only the distinct cells of the path; grids already held by the feature
+  # cache are read directly, and rays are walked once per cell and axis so
+  # neighboring path cells on the same line share them
+  def _pathCellMetrics(self):
+    cells = set(self.path)
+    self.ray_memo = {}
+
+    def lookup(grid):
+      return lambda row, col: grid[row][col]
+
+    def evaluate(cell_metric):
+      values = dict((cell, cell_metric(cell[0], cell[1])) for cell in cells)
+      return lambda row, col: values[(row, col)]
+
+    cached = self.features.cachedGrid if self.features is not None else lambda key: None
+    grids = [
+      cached("closestWall"),
+      cached("avgVisibility"),
+      cached(("dispersion", self.radius)),
+      cached("characteristic_dimension"),
+    ]
+    per_cell = [
+      self._distToClosestWall,
+      self._lazyAvgVisCell,
+      lambda row, col: self._cellDispersion(row, col, self.radius),
+      self._lazyCharDimCell,
+    ]
+
+    return [lookup(grid) if grid is not None else evaluate(cell_metric) for grid, cell_metric in zip(grids, per_cell)]
+
+  # open run length along axis after (r, c) and whether it ends at a wall,
+  # like grid_ops.run_lengths for a single cell; every cell walked over is
+  # memoized, and full run length grids of the feature cache are used if present
+  def _ray(self, r, c, axis):
+    if self.features is not None and axis in self.features.metrics.run_lengths:
+      runs, hits = self.features.metrics.run_lengths[axis]
+      return int(runs[r][c]), bool(hits[r][c])
+
+    memo = self.ray_memo
+    if (r, c, axis) in memo:
+      return memo[(r, c, axis)]
+
+    trail = []
+    r_curr = r
+    c_curr = c
+    while True:
+      trail.append((r_curr, c_curr, axis))
+      r_next = r_curr + axis[0]
+      c_next = c_curr + axis[1]
+      if not self._isInMap(r_next, c_next):
+        run, hits = 0, False
+        break
+      if self.map[r_next][c_next] == 1:
+        run, hits = 0, True
+        break
+      if (r_next, c_next, axis) in memo:
+        run, hits = memo[(r_next, c_next, axis)]
+        run += 1
+        break
+
+      r_curr = r_next
+      c_curr = c_next
+
+    # every earlier cell of the trail sees one more open cell
+    for key in reversed(trail):
+      memo[key] = (run, hits)
+      run += 1
+
+    return memo[(r, c, axis)]
+
+  # _avgVisCell from memoized rays
+  def _lazyAvgVisCell(self, r, c):
+    if self.map[r][c] == 1:
+      return 0
+
+    total_vis = 0
+    num_axes = 0
+    for axis in self.axes:
+      run, hits = self._ray(r, c, axis)
+      if hits:
+        total_vis += run + 1
+        num_axes += 1
+
+    return total_vis / num_axes
+
+  # characteristic_dimension of one cell from memoized rays
+  def _lazyCharDimCell(self, r, c):
+    if self.map[r][c] == 1:
+      return -1
+
+    widths = []
+    for axis in self.axes[:4]:
+      reverse_axis = (axis[0] * -1, axis[1] * -1)
+      widths.append(self._ray(r, c, axis)[0] + self._ray(r, c, reverse_axis)[0])
+
+    return min(widths)
+
+
+# whole-grid metrics of one map, each computed lazily and at most once so the
+# A* penalty, avg_all_metrics and Display can share them; call invalidate()
+# after changing the map in place
+class MapFeatures:
+  def __init__(self, map, radius):
+    self.map = map
+    self.radius = radius
+    self.invalidate()
+
+  def invalidate(self):
+    self.grids = {}
+    self.metrics = DifficultyMetrics(self.map, [], self.radius)
+
+  # grid stored under key if it was already computed, else None
+  def cachedGrid(self, key):
+    return self.grids.get(key)
+
+  def _grid(self, key, compute):
+    if key not in self.grids:
+      self.grids[key] = compute()
+
+    return self.grids[key]
+
+  # open run length and wall hit along axis, see grid_ops.run_lengths
+  def runLengths(self, axis):
+    return self.metrics._runLengths(axis)
+
+  def closestWall(self):
+    return self._grid("closestWall", self.metrics.closestWall)
+
+  def avgVisibility(self):
+    return self._grid("avgVisibility", self.metrics.avgVisibility)
+
+  def characteristic_dimension(self):
+    return self._grid("characteristic_dimension", self.metrics.characteristic_dimension)
+
+  def dispersion(self, radius=None):
+    if radius is None:
+      radius = self.radius
+    return self._grid(("dispersion", radius), lambda: self.metrics.dispersion(radius))
+
+  def density(self, radius=None):
+    if radius is None:
+      radius = self.radius
+    return self._grid(("density", radius), lambda: self.metrics.density(radius))
@@ -1,14 +1,16 @@
 import random
 import sys
+import collections
 import datetime
 import Queue
 import math
-import matplotlib.pyplot as plt
-import Tkinter as tk
+import heapq
+import time
 from world_writer import WorldWriter
 import numpy as np
 import difficulty_quant
-from difficulty_quant import DifficultyMetrics
+import grid_ops
+from difficulty_quant import DifficultyMetrics, MapFeatures
 from pgm_writer import PGMWriter
 from yaml_writer import YamlWriter
 
@@ -18,29 +20,44 @@ pgm_res = 0.15 # meters per pixel
 infl_rad = 0.3 # meters
 
 class ObstacleMap():
-  def __init__(self, rows, cols, randFillPct, seed=None, smoothIter=5):
+  # vectorized runs the fill and smoothing over whole numpy arrays,
+  # otherwise the original cell-by-cell loops are used
+  # rng is the random.Random to fill from, by default one seeded with seed
+  def __init__(self, rows, cols, randFillPct, seed=None, smoothIter=5, vectorized=True, rng=None):
     self.map = [[0 for i in range(cols)] for j in range(rows)]
     self.rows = rows
     self.cols = cols
     self.randFillPct = randFillPct
     self.seed = seed
     self.smoothIter = smoothIter
+    self.vectorized = vectorized
+    self.rng = rng if rng is not None else random.Random(seed)
 
   def __call__(self):
+    if self.vectorized:
+      self._fillAndSmoothArray()
+      return
+
     self._randomFill()
     for n in range(self.smoothIter):
       self._smooth()
 
-  def _randomFill(self):
-    if self.seed:
-      random.seed(self.seed)
+  # array-backed equivalent of _randomFill followed by smoothIter _smooth calls,
+  # produces the same map for the same seed
+  def _fillAndSmoothArray(self):
+    grid = grid_ops.random_fill(self.rows, self.cols, self.randFillPct, self.rng)
+    for n in range(self.smoothIter):
+      grid = grid_ops.smooth(grid)
 
+    self.map = grid.tolist()
+
+  def _randomFill(self):
     for r in range(self.rows):
       for c in range(self.cols):
         if r == 0 or r == self.rows - 1:
           self.map[r][c] = 1
         else:
-          self.map[r][c] = 1 if random.random() < self.randFillPct else 0
+          self.map[r][c] = 1 if self.rng.random() < self.randFillPct else 0
 
   def _smooth(self):
     newmap = [[self.map[r][c] for c in range(self.cols)] for r in range(self.rows)]
@@ -74,11 +91,14 @@ class ObstacleMap():
     return r >= 0 and r < self.rows and c >= 0 and c < self.cols
 
   # update the obstacle map given the jackal-space
-  # coordinates that were cleared to ensure connectivity
+  # coordinates that were cleared to ensure connectivity,
+  # emptying the kernel_size square centered on each one
+  # (2 * robot_radius + 1 for a robot_radius c-space)
   def updateObstacleMap(self, cleared_coords, kernel_size):
+    half = kernel_size // 2
     for coord in cleared_coords:
-      for r in range(coord[0], coord[0] + kernel_size):
-        for c in range(coord[1], coord[1] + kernel_size):
+      for r in range(max(coord[0] - half, 0), min(coord[0] - half + kernel_size, self.rows)):
+        for c in range(max(coord[1] - half, 0), min(coord[1] - half + kernel_size, self.cols)):
           self.map[r][c] = 0
 
     return self.map
@@ -86,14 +106,106 @@ class ObstacleMap():
   def getMap(self):
     return self.map
 
+
+# fills and smooths one obstacle map per seed as a single (n, rows, cols) stack,
+# map i is the same as ObstacleMap(rows, cols, randFillPct, seeds[i], smoothIter)
+def obstacleMapBatch(seeds, rows, cols, randFillPct, smoothIter=5):
+  batch = np.empty((len(seeds), rows, cols), dtype=np.int8)
+  for n, seed in enumerate(seeds):
+    batch[n] = grid_ops.random_fill(rows, cols, randFillPct, random.Random(seed))
+
+  for n in range(smoothIter):
+    batch = grid_ops.smooth(batch)
+
+  return batch
+
+
+# c-spaces of one obstacle map for any robot radius, all thresholded from a
+# single chebyshev obstacle distance field instead of dilating the map again
+# for every radius; cspace(r) is the same as JackalMap(ob_map, r).getMap()
+class CSpaceFamily:
+  def __init__(self, ob_map):
+    self.ob_map = ob_map
+    self.obstacle_dist = grid_ops.chebyshev_distance(ob_map)
+
+  def cspace(self, robot_radius):
+    return (self.obstacle_dist <= robot_radius).astype(np.int8)
+
+  # JackalMap for robot_radius over the family's c-space, ob_map defaults to
+  # the family's obstacle map
+  def jackalMap(self, robot_radius, rng=None, infl_rad=infl_rad, pgm_res=pgm_res, ob_map=None):
+    if ob_map is None:
+      ob_map = self.ob_map
+
+    return JackalMap(ob_map, robot_radius, rng=rng, cspace=self.cspace(robot_radius), infl_rad=infl_rad, pgm_res=pgm_res)
+
+
 class JackalMap:
-  def __init__(self, ob_map, robot_radius):
+  # vectorized builds the c-space with a whole-grid dilation,
+  # otherwise every cell is checked with _open
+  # rng is the random.Random used to open a border cell when none is open
+  # cspace is the c-space for robot_radius if it is already known, e.g. from
+  # a CSpaceFamily, so it isn't built again
+  # infl_rad (meters) and pgm_res (meters per cell) set the inflation radius
+  # within which the path search penalizes cells
+  def __init__(self, ob_map, robot_radius, vectorized=True, rng=None, cspace=None, infl_rad=infl_rad, pgm_res=pgm_res):
     self.ob_map = ob_map
+    self.robot_radius = robot_radius
+    self.rng = rng if rng is not None else random.Random()
     self.rows = len(ob_map)
     self.cols = len(ob_map[0])
+    self.infl_rad = infl_rad
+    self.pgm_res = pgm_res
 
-    self.map = self._jackalMapFromObstacleMap(robot_radius)
+    if cspace is not None:
+      self.map = np.asarray(cspace, dtype=np.int8).tolist()
+    elif vectorized:
+      self.map = grid_ops.dilate(ob_map, robot_radius).tolist()
+    else:
+      self.map = self._jackalMapFromObstacleMap(robot_radius)
+    self.labels = None
+    self.region_sizes = None
+    self.features = None
+    self.heuristic = None
     self.infl_rad_cells = self.calc_infl_rad_cells()
+    # why the last leg search of getPath stopped, see HeapAStarSearch
+    self.search_stop_reason = None
+    # whether the last getPath path has a leg found without the turn limit
+    self.path_relaxed = False
+    # border cells opened in the c-space only, because no region reached that border
+    self.opened_border_cells = []
+    # (first, last) rows such a border cell is drawn from, None for 1 to rows - 1
+    self.border_rows = None
+
+  # whole-grid metrics of the c-space, computed lazily and shared by
+  # the path search, the saved metrics and the display
+  def getFeatures(self, radius=3):
+    if self.features is None:
+      self.features = MapFeatures(self.map, radius)
+
+    return self.features
+
+  # CostToGoHeuristic of the c-space over the feature cache's closest wall
+  # distances, so fields for a goal are only computed once
+  def getHeuristic(self):
+    if self.heuristic is None:
+      self.heuristic = CostToGoHeuristic(self.map, self.infl_rad_cells, self.getFeatures().closestWall())
+
+    return self.heuristic
+
+  # builds the c-space again from the obstacle map, after obstacles were cleared
+  def rebuildFromObstacleMap(self):
+    self.map = grid_ops.dilate(self.ob_map, self.robot_radius).tolist()
+    self.features = None
+    self.invalidateFeatures()
+
+  # drops everything derived from the c-space, call after changing self.map in place
+  def invalidateFeatures(self):
+    self.labels = None
+    self.region_sizes = None
+    self.heuristic = None
+    if self.features is not None:
+      self.features.invalidate()
 
   # use flood-fill algorithm to find the open region including (r, c)
   def _getRegion(self, r, c):
@@ -124,59 +236,71 @@ class JackalMap:
 
     return region, size
 
-  # returns the largest contiguous region with a tile in the leftmost column
-  def biggestLeftRegion(self):
-    maxSize = 0
-    maxRegion = []
-    for row in range(self.rows):
-      region, size = self._getRegion(row, 0)
+  # labels every open region of the c-space once, cached until the map changes
+  # returns the label grid and the size of each label
+  def labelRegions(self):
+    if self.labels is None:
+      self.labels, self.region_sizes = grid_ops.label_regions(self.map)
 
-      if size > maxSize:
-        maxSize = size
-        maxRegion = region
+    return self.labels, self.region_sizes
 
-    # no region available, just generate random open spot
-    if maxSize == 0:
-      randomRow = random.randint(1, self.rows - 1)
-      self.map[randomRow][0] = 0
+  # label of the largest region with a tile in column col, 0 if there is none
+  # ties go to the region reached first from the top, as with the row-by-row flood fills
+  def _biggestBorderLabel(self, col):
+    labels, sizes = self.labelRegions()
+    border = labels[:, col]
+    border = border[border > 0]
+    if len(border) == 0:
+      return 0
 
-      maxRegion = [[0 for i in range(self.cols)] for j in range(self.rows)]
-      maxRegion[randomRow][0] = 1
+    return border[np.argmax(sizes[border])]
 
-    return maxRegion
+  def biggestLeftLabel(self):
+    return self._biggestBorderLabel(0)
 
-  # returns the largest contiguous region with a tile in the rightmost column
-  def biggestRightRegion(self):
-    maxSize = 0
-    maxRegion = []
-    for row in range(self.rows):
-      region, size = self._getRegion(row, self.cols-1)
+  def biggestRightLabel(self):
+    return self._biggestBorderLabel(self.cols - 1)
 
-      if size > maxSize:
-        maxSize = size
-        maxRegion = region
+  # 1 on every cell of the region with the given label
+  def getRegionMask(self, label):
+    labels, sizes = self.labelRegions()
+    return (labels == label).astype(np.int8)
 
-    # no region available, just generate random open spot
-    if maxSize == 0:
-      randomRow = random.randint(1, self.rows - 1)
-      self.map[randomRow][self.cols - 1] = 0
+  # returns the largest contiguous region with a tile in the leftmost column
+  def biggestLeftRegion(self):
+    return self._biggestBorderRegion(0)
 
-      maxRegion = [[0 for i in range(self.cols)] for j in range(self.rows)]
-      maxRegion[randomRow][self.cols - 1] = 1
+  # returns the largest contiguous region with a tile in the rightmost column
+  def biggestRightRegion(self):
+    return self._biggestBorderRegion(self.cols - 1)
 
-    return maxRegion
+  def _biggestBorderRegion(self, col):
+    label = self._biggestBorderLabel(col)
 
+    # no region available, just generate random open spot
+    if label == 0:
+      first_row, last_row = self.border_rows if self.border_rows is not None else (1, self.rows - 1)
+      randomRow = self.rng.randint(first_row, last_row)
+      self.map[randomRow][col] = 0
+      self.opened_border_cells.append((randomRow, col))
+      self.invalidateFeatures()
+      label = self.labelRegions()[0][randomRow][col]
+
+    return self.getRegionMask(label)
+
+  # label of the component a region belongs to, 0 for an empty region
+  def _regionLabel(self, region):
+    cells = np.flatnonzero(np.asarray(region) == 1)
+    if len(cells) == 0:
+      return 0
+
+    labels, sizes = self.labelRegions()
+    return labels.flat[cells[0]]
+
+  # regions are connected when they are part of the same labeled component
   def regionsAreConnected(self, regionA, regionB):
-    for r in range(len(regionA)):
-      for c in range(len(regionA[0])):
-        if regionA[r][c] != regionB[r][c]:
-          return False
-
-        # if they share any common spaces, they're connected
-        elif regionA[r][c] == 1 and regionB[r][c] == 1:
-          return True
-
-    return False
+    labelA = self._regionLabel(regionA)
+    return labelA != 0 and labelA == self._regionLabel(regionB)
 
   def connectRegions(self, regionA, regionB):
     coords_cleared = []
@@ -218,11 +342,89 @@ class JackalMap:
       coords_cleared.append((rmar + count * udchange, rmac + (lmbc - rmac)))
       self.map[rmar+count*udchange][rmac+(lmbc-rmac)] = 0
 
+    self.invalidateFeatures()
+    return coords_cleared
+
+  # rows robot_radius + 1 to rows - robot_radius - 2, the c-space cells whose
+  # obstacles can be cleared without touching the top and bottom rows of the
+  # obstacle map
+  def repairRows(self):
+    return self.robot_radius + 1, self.rows - self.robot_radius - 2
+
+  # connects regionA to regionB through the fewest wall cells, found with a
+  # 0-1 BFS from regionA where stepping onto an open cell is free and onto a
+  # wall cell costs 1; walls are only cleared in repairRows
+  # returns the cleared cells in order from regionA, None if regionB can't be reached
+  def carveCorridor(self, regionA, regionB):
+    if self.regionsAreConnected(regionA, regionB):
+      return []
+
+    rows = self.rows
+    cols = self.cols
+    walls = np.asarray(self.map).ravel().tolist()
+    targets = np.asarray(regionB).ravel().tolist()
+    first_row, last_row = self.repairRows()
+
+    cost = [float('inf')] * (rows * cols)
+    parent = [-1] * (rows * cols)
+    queue = collections.deque()
+    for cell in np.flatnonzero(np.asarray(regionA) == 1).tolist():
+      cost[cell] = 0
+      queue.append(cell)
+
+    end_cell = -1
+    while queue:
+      cell = queue.popleft()
+      if targets[cell] == 1:
+        end_cell = cell
+        break
+
+      r, c = divmod(cell, cols)
+      for dr, dc in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
+        next_r = r + dr
+        next_c = c + dc
+        if next_r < 0 or next_r >= rows or next_c < 0 or next_c >= cols:
+          continue
+
+        next_cell = next_r * cols + next_c
+        wall = walls[next_cell]
+        if wall == 1 and (next_r < first_row or next_r > last_row):
+          continue
+
+        next_cost = cost[cell] + wall
+        if next_cost < cost[next_cell]:
+          cost[next_cell] = next_cost
+          parent[next_cell] = cell
+          if wall == 1:
+            queue.append(next_cell)
+          else:
+            queue.appendleft(next_cell)
+
+    if end_cell == -1:
+      return None
+
+    print("Carving a corridor between separate regions")
+    coords_cleared = []
+    cell = end_cell
+    while cell != -1:
+      if walls[cell] == 1:
+        r, c = divmod(cell, cols)
+        coords_cleared.append((r, c))
+        self.map[r][c] = 0
+      cell = parent[cell]
+
+    coords_cleared.reverse()
+    self.invalidateFeatures()
     return coords_cleared
 
   # returns a path between all points in the list points using A*
   # if a valid path cannot be found, returns None
-  def getPath(self, points, dist_map):
+  # dist_map defaults to the closest wall distances of the feature cache
+  # heuristic is a costToGo field rooted at the last point, used by the search
+  # of the last leg
+  # stats is a SearchStats whose budgets bound every search and which records
+  # why and how long each one ran
+  def getPath(self, points, dist_map=None, heuristic=None, stats=None):
     num_points = len(points)
     if num_points < 2:
       raise Exception("Path needs at least two points")
@@ -232,14 +434,16 @@ class JackalMap:
       if self.map[point[0]][point[1]] == 1:
         raise Exception("The point (%d, %d) is a wall" % (point[0], point[1]))
 
+    if dist_map is None:
+      dist_map = self.getFeatures().closestWall()
+
+    self.path_relaxed = False
     overall_path = []
     for n in range(num_points - 1):
       overall_path.append(points[n])
 
       # generate path between this point and the next one in the list
-      a_star = AStarSearch(self.map, self.infl_rad_cells)
-
-      intermediate_path = a_star(points[n], points[n+1], dist_map)
+      intermediate_path = self._searchLeg(points[n], points[n+1], dist_map, heuristic if n == num_points - 2 else None, stats)
       if not intermediate_path:
         return None
       
@@ -250,6 +454,42 @@ class JackalMap:
 
     return overall_path
 
+  # searches one leg of getPath within the budgets of stats; when a budget
+  # runs out and stats allows relax_turns, the leg is searched again without
+  # the turn limit and with the exact cost-to-go of that relaxed search as
+  # heuristic, and path_relaxed is set if that finds the path; otherwise the
+  # leg fails
+  def _searchLeg(self, start, end, dist_map, heuristic, stats):
+    max_expansions = stats.max_expansions if stats is not None else None
+    max_seconds = stats.max_seconds if stats is not None else None
+    turn_limits = [True, False] if stats is not None and stats.relax_turns else [True]
+
+    for turn_limit in turn_limits:
+      start_time = time.time()
+      if not turn_limit and heuristic is None:
+        heuristic = self.costToGo(end, dist_map)
+
+      a_star = HeapAStarSearch(self.map, self.infl_rad_cells, turn_limit=turn_limit, max_expansions=max_expansions, max_seconds=max_seconds)
+      path = a_star(start, end, dist_map, heuristic)
+      self.search_stop_reason = a_star.stop_reason
+      if stats is not None:
+        stats.record(a_star.stop_reason, time.time() - start_time, turn_limit)
+
+      if a_star.stop_reason not in HeapAStarSearch.budget_reasons:
+        if path and not turn_limit:
+          self.path_relaxed = True
+        return path
+
+    return None
+
+  # cost of the cheapest path from every cell to goal, see HeapAStarSearch.costToGo
+  # fields over the feature cache's distances are cached by getHeuristic
+  def costToGo(self, goal, dist_map=None):
+    if dist_map is None:
+      return self.getHeuristic().field(goal)
+
+    return HeapAStarSearch(self.map, self.infl_rad_cells).costToGo(goal, dist_map)
+
   # robot_radius is how many cells from the center cell the robot takes up
   # robot_radius of 1 means robot takes up 3x3 cells
   # robot_radius of 2 means robot takes up 5x5 cells
@@ -277,7 +517,7 @@ class JackalMap:
 
   # translate the inflation radius from meters to cells
   def calc_infl_rad_cells(self):
-    rad_in_cells = infl_rad * (1.0 / pgm_res)
+    rad_in_cells = self.infl_rad * (1.0 / self.pgm_res)
     return round(rad_in_cells, 0)
 
 
@@ -292,7 +532,12 @@ class AStarSearch:
     self.map_cols = len(map[0])
     self.infl_rad_cells = infl_rad_cells ########################
 
-  def __call__(self, start_coord, end_coord, dist_map):
+  # heuristic is a cost-to-go field rooted at end_coord, e.g. from a
+  # CostToGoHeuristic, to use instead of the straight-line distance; the field
+  # includes the inflation penalty that g here leaves out, so it can
+  # overestimate and the path found is not always the cheapest one, only
+  # cells it marks unreachable are safe to skip
+  def __call__(self, start_coord, end_coord, dist_map, heuristic=None):
     # limit turns to 45 degrees
     valid_moves_dict = {
       (0, 1): [(-1, 1), (0, 1), (1, 1)],
@@ -314,6 +559,10 @@ class AStarSearch:
     end_node = Node(None, end_coord)
     end_node.g = end_node.h = end_node.f = 0
 
+    # no path if the goal can't be reached from the start at all
+    if heuristic is not None and heuristic[start_coord[0]][start_coord[1]] == float('inf'):
+      return None
+
     # initialize lists to track nodes we've visited or not
     visited = []
     not_visited = []
@@ -365,6 +614,10 @@ class AStarSearch:
         if self.map[child_pos[0]][child_pos[1]] == 1:
           continue
 
+        # if the goal can't be reached from there, no use going
+        if heuristic is not None and heuristic[child_pos[0]][child_pos[1]] == float('inf'):
+          continue
+
         # also not possible to move between diagonal walls
         if move[0] != 0 and move[1] != 0 and self.map[curr_node.r+move[0]][curr_node.c] == 1 and self.map[curr_node.r][curr_node.c+move[1]] == 1:
           continue
@@ -396,7 +649,7 @@ class AStarSearch:
             if child_g < node.g:
               node.parent = curr_node
               node.g = child_g
-              node.h = math.sqrt(((child.r - end_node.r) ** 2) + ((child.c - end_node.c) ** 2))
+              node.h = self._estimate(child, end_node, heuristic)
 
               # distance from start + distance to end + factor to penalize cells close to walls
               node.f = node.g + node.h + penalty
@@ -404,10 +657,17 @@ class AStarSearch:
         # if child is not yet in the unprocessed list, add it
         if not child_in_openset:
           child.g = child_g
-          child.h = math.sqrt(((child.r - end_node.r) ** 2) + ((child.c - end_node.c) ** 2))
-          child.f = child.g + child.f + penalty
+          child.h = self._estimate(child, end_node, heuristic)
+          child.f = child.g + child.h + penalty
           not_visited.append(child)
 
+  # straight-line distance from node to end_node, or its cost-to-go if a heuristic field is given
+  def _estimate(self, node, end_node, heuristic):
+    if heuristic is None:
+      return math.sqrt(((node.r - end_node.r) ** 2) + ((node.c - end_node.c) ** 2))
+
+    return heuristic[node.r][node.c]
+
   # generate the path from start to end
   def returnPath(self, end_node):
     path = []
@@ -420,6 +680,276 @@ class AStarSearch:
     return path
 
 
+# A* over (row, col, heading) states using a binary heap and flat per-state
+# cost and parent arrays, with the same 45 degree turn limit and inflation
+# radius penalty as AStarSearch. states are closed per heading, since the turn
+# limit makes the same cell reached from different directions distinct states.
+# the penalty is charged as part of the cost of entering a cell, so it adds up
+# along the path instead of only ordering the open set.
+# max_expansions and max_seconds bound a search, after which it gives up;
+# stop_reason tells why the last search ended: "found", "exhausted" when no
+# path exists, or the budget that ran out. turn_limit=False drops the 45
+# degree turn limit, leaving one state per cell.
+class HeapAStarSearch:
+  # moves in turning order, so a heading can continue or turn to either neighbor
+  moves = [(0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1), (-1, 0), (-1, 1)]
+
+  # heading index of the start state, which may leave in any direction
+  start_heading = 8
+  num_headings = 9
+
+  budget_reasons = ["expansion_budget", "time_budget"]
+
+  # expansions between checks of max_seconds
+  clock_interval = 256
+
+  def __init__(self, map, infl_rad_cells, penalty_factor=5.0, turn_limit=True, max_expansions=None, max_seconds=None):
+    self.map = map
+    self.map_rows = len(map)
+    self.map_cols = len(map[0])
+    self.infl_rad_cells = infl_rad_cells
+    self.penalty_factor = penalty_factor
+    self.turn_limit = turn_limit
+    self.max_expansions = max_expansions
+    self.max_seconds = max_seconds
+    self.stop_reason = None
+    self.expansions = 0
+
+  # penalty for entering each cell, flattened in row-major order
+  def _cellPenalties(self, dist_map):
+    dists = np.asarray(dist_map, dtype=float)
+    with np.errstate(divide='ignore'):
+      penalty = np.where((dists <= self.infl_rad_cells) & (dists > 0), self.penalty_factor / dists, 0.0)
+
+    return penalty.ravel().tolist()
+
+  # cost of the cheapest path from every cell to end_coord as a (rows, cols)
+  # array, inf where end_coord can't be reached, by a dijkstra search backward
+  # from end_coord with the same step lengths, penalties and diagonal rule;
+  # turns aren't limited, so it never overestimates and is an admissible
+  # heuristic for searches to end_coord
+  def costToGo(self, end_coord, dist_map):
+    rows = self.map_rows
+    cols = self.map_cols
+    walls = np.asarray(self.map).ravel().tolist()
+    penalty = self._cellPenalties(dist_map)
+    steps = [(dr * cols + dc, math.sqrt(dr * dr + dc * dc), dr, dc) for dr, dc in self.moves]
+
+    cost = [float('inf')] * (rows * cols)
+    end_cell = end_coord[0] * cols + end_coord[1]
+    cost[end_cell] = 0.0
+    open_set = [(0.0, end_cell)]
+
+    while open_set:
+      curr_cost, cell = heapq.heappop(open_set)
+      if curr_cost > cost[cell]:
+        continue
+
+      r, c = divmod(cell, cols)
+      step_penalty = penalty[cell]
+      for offset, length, dr, dc in steps:
+        # the cell that reaches this one by moving (dr, dc)
+        prev_r = r - dr
+        prev_c = c - dc
+        if prev_r < 0 or prev_r >= rows or prev_c < 0 or prev_c >= cols:
+          continue
+        prev_cell = cell - offset
+        if walls[prev_cell] == 1:
+          continue
+
+        # also not possible to move between diagonal walls
+        if dr != 0 and dc != 0 and walls[prev_cell + dr * cols] == 1 and walls[prev_cell + dc] == 1:
+          continue
+
+        prev_cost = curr_cost + length + step_penalty
+        if prev_cost < cost[prev_cell]:
+          cost[prev_cell] = prev_cost
+          heapq.heappush(open_set, (prev_cost, prev_cell))
+
+    return np.asarray(cost).reshape(rows, cols)
+
+  # heuristic is a costToGo field rooted at end_coord to use instead of the
+  # straight-line distance, cells it can't reach from end_coord are skipped
+  def __call__(self, start_coord, end_coord, dist_map, heuristic=None):
+    rows = self.map_rows
+    cols = self.map_cols
+    headings = self.num_headings
+    walls = np.asarray(self.map).ravel().tolist()
+    penalty = self._cellPenalties(dist_map)
+    if heuristic is not None:
+      heuristic = np.asarray(heuristic, dtype=float).ravel().tolist()
+
+    # (cell offset, step length, row move, col move) for every heading
+    steps = [(dr * cols + dc, math.sqrt(dr * dr + dc * dc), dr, dc) for dr, dc in self.moves]
+    turns = [((h - 1) % 8, h, (h + 1) % 8) for h in range(8)]
+    turns.append(tuple(range(8)))
+
+    g = [float('inf')] * (rows * cols * headings)
+    parent = [-1] * (rows * cols * headings)
+    closed = bytearray(rows * cols * headings)
+
+    end_r, end_c = end_coord
+    start_cell = start_coord[0] * cols + start_coord[1]
+    start_state = start_cell * headings + self.start_heading
+    g[start_state] = 0.0
+    self.expansions = 0
+    self.stop_reason = "exhausted"
+    if heuristic is None:
+      start_h = math.sqrt((start_coord[0] - end_r) ** 2 + (start_coord[1] - end_c) ** 2)
+    else:
+      start_h = heuristic[start_cell]
+      if start_h == float('inf'):
+        return None
+    open_set = [(start_h, start_state)]
+
+    max_expansions = self.max_expansions if self.max_expansions is not None else float('inf')
+    deadline = time.time() + self.max_seconds if self.max_seconds is not None else None
+    expansions = 0
+
+    while open_set:
+      f, state = heapq.heappop(open_set)
+      if closed[state]:
+        continue
+      closed[state] = 1
+
+      cell, heading = divmod(state, headings)
+      r, c = divmod(cell, cols)
+      if r == end_r and c == end_c:
+        self.expansions = expansions
+        self.stop_reason = "found"
+        return self._returnPath(parent, state)
+
+      # give up once a budget runs out
+      expansions += 1
+      if expansions > max_expansions:
+        self.expansions = expansions
+        self.stop_reason = "expansion_budget"
+        return None
+      if deadline is not None and expansions % self.clock_interval == 0 and time.time() > deadline:
+        self.expansions = expansions
+        self.stop_reason = "time_budget"
+        return None
+
+      curr_g = g[state]
+      for move in turns[heading]:
+        offset, length, dr, dc = steps[move]
+        child_r = r + dr
+        child_c = c + dc
+
+        # if outside the map or a wall tile, not possible
+        if child_r < 0 or child_r >= rows or child_c < 0 or child_c >= cols:
+          continue
+        child_cell = cell + offset
+        if walls[child_cell] == 1:
+          continue
+
+        # also not possible to move between diagonal walls
+        if dr != 0 and dc != 0 and walls[cell + dr * cols] == 1 and walls[cell + dc] == 1:
+          continue
+
+        child_state = child_cell * headings + (move if self.turn_limit else self.start_heading)
+        if closed[child_state]:
+          continue
+
+        child_g = curr_g + length + penalty[child_cell]
+        if child_g < g[child_state]:
+          g[child_state] = child_g
+          parent[child_state] = state
+          if heuristic is None:
+            h = math.sqrt((child_r - end_r) ** 2 + (child_c - end_c) ** 2)
+          else:
+            h = heuristic[child_cell]
+            if h == float('inf'):
+              continue
+          heapq.heappush(open_set, (child_g + h, child_state))
+
+    self.expansions = expansions
+
+  # generate the path from start to end by following parent states
+  def _returnPath(self, parent, state):
+    path = []
+    while state != -1:
+      r, c = divmod(state // self.num_headings, self.map_cols)
+      path.append((r, c))
+      state = parent[state]
+
+    path.reverse()
+    return path
+
+
+# cost-to-go fields of one map by goal, computed with HeapAStarSearch.costToGo
+# on first use; a field is an admissible heuristic for HeapAStarSearch
+# searches to its goal with the same penalty_factor (not for AStarSearch,
+# whose g leaves out the inflation penalty), and doubles as a check of
+# whether the goal can be reached from a start at all
+class CostToGoHeuristic:
+  def __init__(self, map, infl_rad_cells, dist_map, penalty_factor=5.0):
+    self.search = HeapAStarSearch(map, infl_rad_cells, penalty_factor)
+    self.dist_map = dist_map
+    self.fields = {}
+
+  def field(self, goal):
+    goal = tuple(goal)
+    if goal not in self.fields:
+      self.fields[goal] = self.search.costToGo(goal, self.dist_map)
+
+    return self.fields[goal]
+
+  # cost of the cheapest path from coord to goal, inf if there is none
+  def __call__(self, coord, goal):
+    return self.field(goal)[coord[0]][coord[1]]
+
+  def reachable(self, start, goal):
+    return self(start, goal) != float('inf')
+
+
+# search budgets for a run, and the stop reason, seconds and turn limit of
+# every search run under them; records from other processes can be merged
+# relax_turns lets a search that ran out of budget be retried without the turn
+# limit, whose paths the robot may not be able to follow, so samples found
+# that way are marked "relaxed"
+class SearchStats:
+  def __init__(self, max_expansions=None, max_seconds=None, relax_turns=False):
+    self.max_expansions = max_expansions
+    self.max_seconds = max_seconds
+    self.relax_turns = relax_turns
+    self.records = []
+
+  def record(self, stop_reason, seconds, turn_limit=True):
+    self.records.append((stop_reason, seconds, turn_limit))
+
+  def merge(self, records):
+    self.records.extend(records)
+
+  # searches by stop reason, with searches run without the turn limit counted
+  # separately as "relaxed_<reason>"
+  def counts(self):
+    counts = {}
+    for stop_reason, seconds, turn_limit in self.records:
+      key = stop_reason if turn_limit else "relaxed_" + stop_reason
+      counts[key] = counts.get(key, 0) + 1
+
+    return counts
+
+  # nearest-rank percentile of the search seconds, q from 0 to 100
+  def latency(self, q):
+    if not self.records:
+      return 0.0
+
+    seconds = sorted(record[1] for record in self.records)
+    rank = int(math.ceil(q / 100.0 * len(seconds)))
+    return seconds[min(max(rank, 1), len(seconds)) - 1]
+
+  def report(self):
+    counts = self.counts()
+    line = "searches: %d, p50 %.1fms, p99 %.1fms, max %.1fms" % (
+        len(self.records), self.latency(50) * 1000, self.latency(99) * 1000, self.latency(100) * 1000)
+    for key in sorted(counts):
+      line += ", %s %d" % (key, counts[key])
+
+    return line
+
+
 class Node:
   def __init__(self, parent, coord):
     self.parent = parent
@@ -435,7 +965,8 @@ class Node:
  
 
 class Display:
-  def __init__(self, map, path, map_with_path, jackal_map, jackal_map_with_path, density_radius, dispersion_radius):
+  # features is the MapFeatures of jackal_map, if its grids were already computed
+  def __init__(self, map, path, map_with_path, jackal_map, jackal_map_with_path, density_radius, dispersion_radius, features=None):
     self.map = map
     self.path = path
     self.map_with_path = map_with_path
@@ -444,7 +975,7 @@ class Display:
     self.density_radius = density_radius
     self.dispersion_radius = dispersion_radius
   
-    diff = DifficultyMetrics(jackal_map, path, density_radius)
+    diff = DifficultyMetrics(jackal_map, path, density_radius, features=features)
     self.metrics = {
       "closestDist": diff.closestWall(),
       "density": diff.density(),
@@ -454,6 +985,8 @@ class Display:
     }
 
   def __call__(self):
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots(3, 3)
     
     
@@ -513,6 +1046,8 @@ class Display:
 
 class Input:
   def __init__(self):
+    import Tkinter as tk
+
     self.root = tk.Tk(className="Parameters")
 
     tk.Label(self.root, text="Seed").grid(row=0)
@@ -599,7 +1134,184 @@ class Input:
     self.root.destroy()
     
 
-def main(iteration=0, seed=0, smoothIter=4, fillPct=.27, rows=30, cols=30, showMetrics=1):
+# builds one candidate world from seed, the same seed always gives the same
+# world; obstacle_map uses the given map instead of generating one, and the
+# returned dict is described in _completeWorld
+def generateWorld(seed=0, smoothIter=4, fillPct=.27, rows=30, cols=30, obstacle_map=None, num_pairs=1, search_stats=None, repair=False):
+    rng = random.Random(seed)
+    obMapGen, obstacle_map = _generateObstacleMap(seed, smoothIter, fillPct, rows, cols, obstacle_map, rng)
+
+    # generate jackal's map from the obstacle map & ensure connectivity
+    jMapGen = JackalMap(obstacle_map, jackal_radius, rng=rng)
+    return _completeWorld(seed, smoothIter, fillPct, obMapGen, obstacle_map, jMapGen, rng, num_pairs, search_stats, repair)
+
+
+# one candidate world per robot radius in radii (by default only
+# jackal_radius), all from the same obstacle map, whose c-spaces are
+# thresholded from one CSpaceFamily; infl_rad and pgm_res set the inflation
+# penalty of every radius, see JackalMap
+# returns a generateWorld dict per radius, in order, each with its
+# "robot_radius"; the start and goal pairs of every radius are drawn from one
+# random.Random(seed) in radius order, so the same seed and radii always give
+# the same worlds
+# with repair, each radius clears obstacles in its own copy of the map
+def generateWorldVariants(seed=0, smoothIter=4, fillPct=.27, rows=30, cols=30, radii=None, obstacle_map=None, num_pairs=1,
+                          search_stats=None, repair=False, infl_rad=infl_rad, pgm_res=pgm_res):
+    if radii is None:
+      radii = [jackal_radius]
+
+    rng = random.Random(seed)
+    obstacle_map = _generateObstacleMap(seed, smoothIter, fillPct, rows, cols, obstacle_map, rng)[1]
+    family = CSpaceFamily(obstacle_map)
+
+    worlds = []
+    for robot_radius in radii:
+      print("Robot radius: %d" % robot_radius)
+      variant_map = [list(row) for row in obstacle_map] if repair else obstacle_map
+      jMapGen = family.jackalMap(robot_radius, rng, infl_rad, pgm_res, ob_map=variant_map)
+      worlds.append(_completeWorld(seed, smoothIter, fillPct, None, variant_map, jMapGen, rng, num_pairs, search_stats, repair))
+
+    return worlds
+
+
+# runs the obstacle map generator, unless obstacle_map is given, and returns
+# it (None for a given map) along with the map
+def _generateObstacleMap(seed, smoothIter, fillPct, rows, cols, obstacle_map, rng):
+    # create world generator and run smoothing iterations
+    print("Seed: %d" % seed)
+    obMapGen = None
+    if obstacle_map is None:
+      obMapGen = ObstacleMap(rows, cols, fillPct, seed, smoothIter, rng=rng)
+      obMapGen()
+
+      # get map from the obstacle map generator
+      obstacle_map = obMapGen.getMap()
+
+    return obMapGen, obstacle_map
+
+
+# the rest of generateWorld once the c-space is built: connectivity, start and
+# goal pairs, paths and metrics; repair carves a corridor through a
+# disconnected map, and num_pairs draws up to that many start and goal pairs
+def _completeWorld(seed, smoothIter, fillPct, obMapGen, obstacle_map, jMapGen, rng, num_pairs, search_stats, repair):
+    # a border cell opened for lack of a region must be one repair can clear
+    first_row, last_row = jMapGen.repairRows()
+    if repair and first_row <= last_row:
+      jMapGen.border_rows = (first_row, last_row)
+
+    startRegion = jMapGen.biggestLeftRegion()
+    endRegion = jMapGen.biggestRightRegion()
+
+    # throw out any maps that don't have a path, unless they can be repaired
+    repaired_cells = 0
+    if not jMapGen.regionsAreConnected(startRegion, endRegion):
+      coords_cleared = jMapGen.carveCorridor(startRegion, endRegion) if repair else None
+      if coords_cleared is None:
+        return { "status" : "disconnected", "seed" : seed }
+
+      # clear the obstacles under the corridor, and under any border cell that
+      # was only opened in the c-space, so the robot fits through them; then
+      # build the c-space again so it matches the cleared obstacle map
+      if obMapGen is None:
+        obMapGen = ObstacleMap(len(obstacle_map), len(obstacle_map[0]), fillPct, seed, smoothIter, rng=rng)
+        obMapGen.map = obstacle_map
+      obMapGen.updateObstacleMap(jMapGen.opened_border_cells + coords_cleared, 2 * jMapGen.robot_radius + 1)
+      jMapGen.rebuildFromObstacleMap()
+
+      repaired_cells = len(coords_cleared)
+      startRegion = jMapGen.biggestLeftRegion()
+      endRegion = jMapGen.biggestRightRegion()
+      if not jMapGen.regionsAreConnected(startRegion, endRegion):
+        return { "status" : "disconnected", "seed" : seed }
+
+    # get the final jackal map and update the obstacle map
+    jackal_map = jMapGen.getMap()
+
+    # Generate random start and end points for path
+    left_open = []
+    right_open = []
+    for r in range(len(jackal_map)):
+      if startRegion[r][0] == 1:
+        left_open.append(r)
+      if endRegion[r][len(jackal_map[0])-1] == 1:
+        right_open.append(r)
+    left_coord_r = left_open[rng.randint(0, len(left_open)-1)]
+    right_coord_r = right_open[rng.randint(0, len(right_open)-1)]
+
+    # further pairs, never the same pair twice
+    pairs = [(left_coord_r, right_coord_r)]
+    max_pairs = min(num_pairs, len(left_open) * len(right_open))
+    while len(pairs) < max_pairs:
+      pair = (left_open[rng.randint(0, len(left_open)-1)], right_open[rng.randint(0, len(right_open)-1)])
+      if pair not in pairs:
+        pairs.append(pair)
+
+    features = jMapGen.getFeatures(radius=3)
+    dist_map = features.closestWall()
+    last_col = len(jackal_map[0])-1
+
+    samples = []
+    out_of_budget = False
+    for left_coord_r, right_coord_r in pairs:
+      # generate path, if possible
+      print("Points: (%d, 0), (%d, %d)" % (left_coord_r, right_coord_r, last_col))
+      heuristic = None
+      if num_pairs > 1:
+        heuristic = jMapGen.getHeuristic().field((right_coord_r, last_col))
+      path = jMapGen.getPath([(left_coord_r, 0), (right_coord_r, last_col)], dist_map, heuristic, search_stats)
+
+      if not path:
+        print("path not found")
+        out_of_budget = out_of_budget or jMapGen.search_stop_reason in HeapAStarSearch.budget_reasons
+        continue
+
+      print("Found path!")
+
+      # metrics averaged over the path
+      diff = DifficultyMetrics(jackal_map, path, radius=3, features=features)
+      samples.append({ "start" : (left_coord_r, 0),
+                       "goal" : (right_coord_r, last_col),
+                       "path" : path,
+                       "relaxed" : jMapGen.path_relaxed,
+                       "metrics" : diff.avg_all_metrics(lazy=True) })
+
+    if not samples:
+      # path not found, throw this one out
+      return { "status" : "search_budget" if out_of_budget else "no_path", "seed" : seed }
+
+    # a rejected world only has its "status" ("disconnected", "no_path" or
+    # "search_budget") and "seed"; an accepted one also has every sample and,
+    # from the first sample, its own start, goal, path, relaxed flag and metrics
+    world = { "status" : "accepted",
+              "seed" : seed,
+              "smoothIter" : smoothIter,
+              "fillPct" : fillPct,
+              "obstacle_map" : obstacle_map,
+              "jackal_map" : jackal_map,
+              "robot_radius" : jMapGen.robot_radius,
+              "features" : features,
+              "repaired_cells" : repaired_cells,
+              "samples" : samples }
+    world.update(samples[0])
+
+    return world
+
+
+# one world dict per sample of an accepted world from generateWorld, each
+# with its own start, goal, path and metrics, to save as separate worlds
+def worldSamples(world):
+    for sample in world["samples"]:
+      sample_world = dict(world)
+      sample_world.update(sample)
+      yield sample_world
+
+
+# writes the .world, grid, c-space, path, metrics, pgm and yaml files of a
+# world from generateWorld under number iteration
+# store is a dataset_store.DatasetWriter that takes the grid, c-space, path
+# and metrics instead of separate .npy files
+# compact_world writes the obstacles as box models instead of cylinders
+def saveWorld(iteration, world, store=None, compact_world=False):
 
     # dirName = "~/jackal_ws/src/jackal_simulator/jackal_gazebo/worlds/"
 
@@ -611,6 +1323,60 @@ def main(iteration=0, seed=0, smoothIter=4, fillPct=.27, rows=30, cols=30, showM
     pgm_file = "dataset/map_files/map_pgm_" + str(iteration) + ".pgm"
     yaml_file = "dataset/map_files/yaml_" + str(iteration) + ".yaml"
 
+    obstacle_map = world["obstacle_map"]
+
+    # write map to .world file
+    cyl_radius = 0.075
+    contain_wall_length = 5
+    writer = WorldWriter(world_file, obstacle_map, cyl_radius=cyl_radius, contain_wall_length=contain_wall_length, compact=compact_world)
+    contain_wall_cylinders = writer()
+    r_shift, c_shift = writer.getShifts()
+
+    # print start and end points in gazebo coords
+    start_r = r_shift + world["start"][0] * cyl_radius * 2
+    start_c = c_shift
+    end_r = r_shift + world["goal"][0] * cyl_radius * 2
+    end_c = len(obstacle_map[0]) * cyl_radius * 2 + c_shift
+    print("Start: (%f, %f) to Goal: (%f, %f)" % (start_r, start_c, end_r, end_c))
+    if world.get("relaxed"):
+      print("Path found without the turn limit")
+
+    if store is not None:
+      store.appendWorld(iteration, world)
+    else:
+      # save occupancy grid
+      grid_arr = np.asarray(obstacle_map)
+      np.save(grid_file, grid_arr)
+
+      # save c-space
+      cspace = np.asarray(world["jackal_map"])
+      np.save(cspace_file, cspace)
+
+      # save path
+      path_arr = np.asarray(world["path"])
+      np.save(path_file, path_arr)
+
+      # save metrics
+      metrics_arr = np.asarray(world["metrics"])
+      np.save(metrics_file, metrics_arr)
+
+    print(np.asarray(world["metrics"]))
+
+    # write the map to a pgm file for navigation
+    pgm_writer = PGMWriter(obstacle_map, contain_wall_cylinders, pgm_file)
+    pgm_writer()
+
+    # write map metadata to yaml file
+    yw = YamlWriter(yaml_file, iteration)
+    yw.write()
+
+
+# generates a world like generateWorld and saves every sample as its own
+# world numbered from iteration on, plotting it unless headless; returns how
+# many were saved
+def main(iteration=0, seed=0, smoothIter=4, fillPct=.27, rows=30, cols=30, showMetrics=1, obstacle_map=None, headless=False, num_pairs=1, search_stats=None,
+         repair=False):
+
     # get user parameters, if provided
     # inputWindow = Input()
     # inputDict = inputWindow.inputs
@@ -622,66 +1388,30 @@ def main(iteration=0, seed=0, smoothIter=4, fillPct=.27, rows=30, cols=30, showM
                   "cols" : cols,
                   "showMetrics" : showMetrics }
 
-    # create 25x25 world generator and run smoothing iterations
-    print("Seed: %d" % inputDict["seed"])
-    obMapGen = ObstacleMap(inputDict["rows"], inputDict["cols"], inputDict["fillPct"], inputDict["seed"], inputDict["smoothIter"])
-    obMapGen()
-
-    # get map from the obstacle map generator
-    obstacle_map = obMapGen.getMap()
-    
-    # generate jackal's map from the obstacle map & ensure connectivity
-    jMapGen = JackalMap(obstacle_map, jackal_radius)
-    startRegion = jMapGen.biggestLeftRegion()
-    endRegion = jMapGen.biggestRightRegion()
-
-    # throw out any maps that don't have a path
-    if not jMapGen.regionsAreConnected(startRegion, endRegion):
+    world = generateWorld(inputDict["seed"], inputDict["smoothIter"], inputDict["fillPct"], inputDict["rows"], inputDict["cols"], obstacle_map, num_pairs, search_stats, repair)
+    if world["status"] != "accepted":
       return
 
-    # get the final jackal map and update the obstacle map
-    jackal_map = jMapGen.getMap()
+    num_saved = 0
+    for sample in worldSamples(world):
+      saveWorld(iteration + num_saved, sample)
+      num_saved += 1
 
-    # write map to .world file
-    cyl_radius = 0.075
-    contain_wall_length = 5
-    writer = WorldWriter(world_file, obstacle_map, cyl_radius=cyl_radius, contain_wall_length=contain_wall_length)
-    contain_wall_cylinders = writer()
-    r_shift, c_shift = writer.getShifts()
+    if not headless:
+      showWorld(world, inputDict["showMetrics"])
 
-    # Generate random start and end points for path
-    left_open = []
-    right_open = []
-    for r in range(len(jackal_map)):
-      if startRegion[r][0] == 1:
-        left_open.append(r)
-      if endRegion[r][len(jackal_map[0])-1] == 1:
-        right_open.append(r)
-    left_coord_r = left_open[random.randint(0, len(left_open)-1)]
-    right_coord_r = right_open[random.randint(0, len(right_open)-1)]
-
-
-    
-    # generate path, if possible
-    path = []
-    diff_quant = DifficultyMetrics(jackal_map, path, radius=3)
-    dist_map = diff_quant.closestWall()
-    print("Points: (%d, 0), (%d, %d)" % (left_coord_r, right_coord_r, len(jackal_map[0])-1))
-    path = jMapGen.getPath([(left_coord_r, 0), (right_coord_r, len(jackal_map[0])-1)], dist_map)
+    return num_saved # paths found
 
-    if not path:
-      print("path not found")
-      return # path not found, throw this one out
 
-    print("Found path!")
-
-
-    # print start and end points in gazebo coords
-    start_r = r_shift + left_coord_r * cyl_radius * 2
-    start_c = c_shift
-    end_r = r_shift + right_coord_r * cyl_radius * 2
-    end_c = len(obstacle_map[0]) * cyl_radius * 2 + c_shift
-    print("Start: (%f, %f) to Goal: (%f, %f)" % (start_r, start_c, end_r, end_c))
+# plots an accepted world from generateWorld, with the metric heatmaps
+# if showMetrics is set, and blocks until the window is closed
+def showWorld(world, showMetrics=1):
+    obstacle_map = world["obstacle_map"]
+    jackal_map = world["jackal_map"]
+    path = world["path"]
+    left_coord_r = world["start"][0]
+    right_coord_r = world["goal"][0]
+    robot_radius = world["robot_radius"]
 
     # put paths into matrices to display them
     obstacle_map_with_path = [[obstacle_map[j][i] for i in range(len(obstacle_map[0]))] for j in range(len(obstacle_map))]
@@ -691,9 +1421,9 @@ def main(iteration=0, seed=0, smoothIter=4, fillPct=.27, rows=30, cols=30, showM
       jackal_map_with_path[r][c] = 0.35
 
       # update obstacle-space path display
-      for r_kernel in range(r - jackal_radius, r + jackal_radius + 1):
-        for c_kernel in range(c - jackal_radius, c + jackal_radius + 1):
-          if 0 <= r_kernel and r_kernel < rows and 0 <= c_kernel and c_kernel < cols:
+      for r_kernel in range(r - robot_radius, r + robot_radius + 1):
+        for c_kernel in range(c - robot_radius, c + robot_radius + 1):
+          if 0 <= r_kernel and r_kernel < len(obstacle_map) and 0 <= c_kernel and c_kernel < len(obstacle_map[0]):
             obstacle_map_with_path[r_kernel][c_kernel] = 0.35
 
 
@@ -702,47 +1432,17 @@ def main(iteration=0, seed=0, smoothIter=4, fillPct=.27, rows=30, cols=30, showM
     obstacle_map_with_path[left_coord_r][0] = 0.65
     obstacle_map_with_path[right_coord_r][len(obstacle_map[0])-1] = 0.65
     
-    # save occupancy grid
-    grid_arr = np.asarray(obstacle_map)
-    np.save(grid_file, grid_arr)
-
-    # save c-space
-    cspace = np.asarray(jackal_map)
-    np.save(cspace_file, cspace)
-
-    # save path
-    path_arr = np.asarray(path)
-    np.save(path_file, path_arr)
-
-    # save metrics
-    diff = DifficultyMetrics(jackal_map, path, radius=3)
-    metrics_arr = np.asarray(diff.avg_all_metrics())
-    print(metrics_arr)
-    np.save(metrics_file, metrics_arr)
-
-
-    # write the map to a pgm file for navigation
-    pgm_writer = PGMWriter(obstacle_map, contain_wall_cylinders, pgm_file)
-    pgm_writer()
-
-    # write map metadata to yaml file
-    yw = YamlWriter(yaml_file, iteration)
-    yw.write()
-    
-
-    
     # display world and heatmap of distances
-    if inputDict["showMetrics"]:
-      display = Display(obstacle_map, path, obstacle_map_with_path, jackal_map, jackal_map_with_path, density_radius=3, dispersion_radius=3)
+    if showMetrics:
+      display = Display(obstacle_map, path, obstacle_map_with_path, jackal_map, jackal_map_with_path, density_radius=3, dispersion_radius=3, features=world["features"])
       display()
 
     # only show the map itself
     else:
+      import matplotlib.pyplot as plt
+
       plt.imshow(obstacle_map_with_path, cmap='Greys', interpolation='nearest')
       plt.show()
-    
-        
-    return True # path found
 
 
 if __name__ == "__main__":
@@ -1,26 +1,153 @@
 import gen_world_ca
+import dataset_store
+import sweep
+import argparse
 import datetime
+import os
 
+# number of obstacle maps filled and smoothed together per call
+batch_size = 16
+rows = 30
+cols = 30
 
-def main():
+# worlds accepted per (fillPct, smooths) bucket
+worlds_per_bucket = 25
+
+# fill percent from 0.15 to 0.35, interval 0.05 (5 levels),
+# smooth iterations from 2 to 4 (3 levels)
+def buckets():
+  for fillPct in sweep.default_spec["fillPct"]:
+    for smooths in sweep.default_spec["smoothIter"]:
+      yield fillPct, smooths
+
+
+# show opens the plots of every accepted world and waits for them to be
+# closed, otherwise worlds are only saved
+# num_pairs saves up to that many start and goal pairs of every map
+# max_expansions and max_seconds bound every path search, relax_turns retries
+# the searches that run out without the turn limit
+# repair connects disconnected maps instead of rejecting them
+def main(show=False, num_pairs=1, max_expansions=None, max_seconds=None, repair=False, relax_turns=False):
   total_counter = 0
+  search_stats = gen_world_ca.SearchStats(max_expansions, max_seconds, relax_turns)
+
+  for fillPct, smooths in buckets():
+    param_counter = 0
+    while param_counter < worlds_per_bucket:
+      base_seed = hash(datetime.datetime.now())
+      seeds = [base_seed + n for n in range(batch_size)]
+      ob_maps = gen_world_ca.obstacleMapBatch(seeds, rows, cols, fillPct, smooths)
+
+      for n in range(batch_size):
+        if param_counter >= worlds_per_bucket:
+          break
 
-  # fill percent from 0.15 to 0.30, interval 0.05 (4 levels)
-  for i in range(5):
-    fillPct = (i * 0.05) + 0.15
-    # smooth iterations from 2 to 4 (3 levels)
-    for smooths in range(2, 5):
-      param_counter = 0
-      while param_counter < 25:
-	print("_________________________________________________________")
-	print("world", total_counter, "fillPct", fillPct, "smooths", smooths)
-        result = gen_world_ca.main(total_counter, hash(datetime.datetime.now()), smooths, fillPct)
+        print("_________________________________________________________")
+        print("world", total_counter, "fillPct", fillPct, "smooths", smooths)
+        result = gen_world_ca.main(total_counter, seeds[n], smooths, fillPct, rows, cols, obstacle_map=ob_maps[n].tolist(), headless=not show,
+                                   num_pairs=min(num_pairs, worlds_per_bucket - param_counter), search_stats=search_stats, repair=repair)
         if result:
-          param_counter += 1
-          total_counter += 1
+          param_counter += result
+          total_counter += result
+
+  print(search_stats.report())
+
+
+# generates the same buckets with a SweepScheduler over a pool of
+# workers processes, every world seeded from master_seed
+# store_root puts grids, c-spaces, paths and metrics in a chunked dataset store;
+# when it already holds worlds, the new ones are numbered after the last one
+def parallelMain(master_seed=0, workers=None, store_root=None, num_pairs=1, max_expansions=None, max_seconds=None, repair=False, relax_turns=False):
+  spec = dict(sweep.default_spec, rows=rows, cols=cols, quota=worlds_per_bucket)
+  store = dataset_store.DatasetWriter(store_root) if store_root is not None else None
+  first_world = _nextWorld(store) if store is not None else 0
+  scheduler = sweep.SweepScheduler(spec, master_seed, workers, num_pairs=num_pairs, max_expansions=max_expansions, max_seconds=max_seconds,
+                                   repair=repair, relax_turns=relax_turns, first_world=first_world)
+
+  if store is None:
+    scheduler.run()
+  else:
+    scheduler.run(lambda iteration, world: gen_world_ca.saveWorld(iteration, world, store))
+    store.close()
+
+  print(scheduler.report())
+
+
+# world number after the last one in a DatasetWriter's store, 0 if it's empty
+def _nextWorld(store):
+  if store.index["num_worlds"] == 0:
+    return 0
+
+  return int(dataset_store.DatasetReader(store.root).ids().max()) + 1
+
+
+# generates maps seeded from master_seed and keeps the world of every robot
+# radius in radii for each, with all c-spaces derived from one obstacle
+# distance field per map; the worlds of radius r go to a chunked store in
+# store_root/radius_<r>, whose index records r, until it holds
+# worlds_per_radius more, and the worlds of the same map get the same world
+# number in every store, numbered after the last world of any of them
+# at most max_maps maps are generated (100 per world wanted by default), and
+# the radii left short are reported; a radius too big to leave an open row
+# in the map is rejected up front
+def variantMain(radii, master_seed=0, store_root="dataset/variants", fillPct=0.2, smoothIter=4, worlds_per_radius=worlds_per_bucket, repair=False,
+                max_maps=None):
+  for radius in radii:
+    if 2 * radius + 3 > rows:
+      raise ValueError("robot radius %d leaves no open row in a %d-row map" % (radius, rows))
+  if max_maps is None:
+    max_maps = 100 * worlds_per_radius
+
+  stores = dict((radius, dataset_store.DatasetWriter(os.path.join(store_root, "radius_%d" % radius))) for radius in radii)
+  saved = dict((radius, 0) for radius in radii)
+  first_world = max(_nextWorld(store) for store in stores.values())
+
+  generated = 0
+  while generated < max_maps:
+    # only the radii whose store still needs worlds
+    pending = [radius for radius in radii if saved[radius] < worlds_per_radius]
+    if not pending:
+      break
+
+    index = first_world + generated
+    seed = sweep.worldSeed(master_seed, index)
+    worlds = gen_world_ca.generateWorldVariants(seed, smoothIter, fillPct, rows, cols, pending, repair=repair)
+    for radius, world in zip(pending, worlds):
+      if world["status"] == "accepted":
+        stores[radius].appendWorld(index, world)
+        saved[radius] += 1
+    generated += 1
 
+  for radius in radii:
+    stores[radius].close()
+    if saved[radius] < worlds_per_radius:
+      print("radius %d: %d worlds, %d short" % (radius, saved[radius], worlds_per_radius - saved[radius]))
+    else:
+      print("radius %d: %d worlds" % (radius, saved[radius]))
+  print("%d maps generated" % generated)
 
 
 if __name__ == "__main__":
-  main()
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--workers", type=int, default=0, help="worker processes, 0 for the serial generator")
+  parser.add_argument("--master-seed", type=int, default=0, help="seed every world is derived from in parallel and --radii modes")
+  parser.add_argument("--store", default=None, help="chunked dataset store directory for parallel mode, or of the per-radius stores for --radii")
+  parser.add_argument("--show", action="store_true", help="plot every world in serial mode")
+  parser.add_argument("--pairs", type=int, default=1, help="start and goal pairs saved per map")
+  parser.add_argument("--max-expansions", type=int, default=None, help="states a path search may expand")
+  parser.add_argument("--max-seconds", type=float, default=None, help="seconds a path search may run")
+  parser.add_argument("--repair", action="store_true", help="connect disconnected maps instead of rejecting them")
+  parser.add_argument("--relax-turns", action="store_true", help="retry searches that run out of budget without the turn limit, marking their paths relaxed")
+  parser.add_argument("--radii", type=int, nargs="+", default=None, help="keep every map's world for each of these robot radii")
+  parser.add_argument("--fill-pct", type=float, default=0.2, help="fill percent of the maps generated for --radii")
+  parser.add_argument("--smooth-iter", type=int, default=4, help="smoothing iterations of the maps generated for --radii")
+  parser.add_argument("--max-maps", type=int, default=None, help="maps --radii may generate, 100 per world wanted by default")
+  args = parser.parse_args()
 
+  if args.radii:
+    variantMain(args.radii, args.master_seed, args.store or "dataset/variants", args.fill_pct, args.smooth_iter, repair=args.repair,
+                max_maps=args.max_maps)
+  elif args.workers:
+    parallelMain(args.master_seed, args.workers, args.store, args.pairs, args.max_expansions, args.max_seconds, args.repair, args.relax_turns)
+  else:
+    main(args.show, args.pairs, args.max_expansions, args.max_seconds, args.repair, args.relax_turns)
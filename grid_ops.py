@@ -0,0 +1,315 @@
+import numpy as np
+
+
+# fills every cell of the interior rows with 1 with probability fill_pct,
+# drawing from rng in the same row-major order as ObstacleMap._randomFill;
+# the top and bottom rows are always walls
+def random_fill(rows, cols, fill_pct, rng):
+  grid = np.ones((rows, cols), dtype=np.int8)
+  interior = max(rows - 2, 0)
+  if interior > 0:
+    draws = np.array([rng.random() for i in range(interior * cols)])
+    grid[1:rows - 1] = (draws < fill_pct).reshape(interior, cols)
+
+  return grid
+
+# number of filled 8-neighbors of every cell, for a (rows, cols) grid or a
+# (n, rows, cols) stack of grids; cells above the top row and below the
+# bottom row count as walls, cells off the left and right edges count as open
+def neighbor_counts(grid):
+  grid = np.asarray(grid)
+  rows, cols = grid.shape[-2:]
+  padded = np.zeros(grid.shape[:-2] + (rows + 2, cols + 2), dtype=np.int8)
+  padded[..., 0, :] = 1
+  padded[..., rows + 1, :] = 1
+  padded[..., 1:rows + 1, 1:cols + 1] = grid
+
+  counts = np.zeros(grid.shape, dtype=np.int8)
+  for dr in range(3):
+    for dc in range(3):
+      if dr != 1 or dc != 1:
+        counts += padded[..., dr:dr + rows, dc:dc + cols]
+
+  return counts
+
+# one cellular automaton step: more than 4 filled neighbors fills a cell,
+# less than 2 empties it, anything else leaves it unchanged
+def smooth(grid):
+  counts = neighbor_counts(grid)
+  smoothed = np.array(grid, dtype=np.int8)
+  smoothed[counts > 4] = 1
+  smoothed[counts < 2] = 0
+
+  return smoothed
+
+# 1 wherever the (2 * radius + 1) square window centered on a cell, clipped to
+# the grid, contains a 1; done as one running-window pass along each axis over
+# prefix sums, so the cost is linear in cells whatever the radius
+def dilate(grid, radius):
+  mask = np.asarray(grid) == 1
+  mask = _window_any(mask, radius, 0)
+  mask = _window_any(mask, radius, 1)
+
+  return mask.astype(np.int8)
+
+# chebyshev (chessboard) distance from every cell to the nearest 1 in the grid,
+# inf everywhere if there is none, so dilate(grid, radius) is 1 exactly where
+# it is at most radius; the two-pass 8-neighbor raster sweep of Rosenfeld &
+# Pfaltz, which is exact for this metric, with the left-to-right dependency
+# inside each row done as a running minimum, so the cost is linear in cells
+def chebyshev_distance(grid):
+  walls = np.asarray(grid) == 1
+  rows, cols = walls.shape
+  dist = np.where(walls, 0.0, np.inf)
+  idx = np.arange(cols)
+
+  for order, step in [(range(rows), -1), (range(rows - 1, -1, -1), 1)]:
+    for r in order:
+      candidates = dist[r].copy()
+      if 0 <= r + step < rows:
+        neighbor = dist[r + step] + 1
+        candidates = np.minimum(candidates, neighbor)
+        candidates[1:] = np.minimum(candidates[1:], neighbor[:-1])
+        candidates[:-1] = np.minimum(candidates[:-1], neighbor[1:])
+
+      # the neighbor towards the start of the sweep in the same row
+      if step < 0:
+        dist[r] = np.minimum.accumulate(candidates - idx) + idx
+      else:
+        dist[r] = (np.minimum.accumulate((candidates + idx)[::-1]) - idx[::-1])[::-1]
+
+  return dist
+
+def _window_any(mask, radius, axis):
+  n = mask.shape[axis]
+  shape = list(mask.shape)
+  shape[axis] = 1
+  sums = np.concatenate((np.zeros(shape, dtype=np.int32), np.cumsum(mask, axis=axis, dtype=np.int32)), axis=axis)
+
+  idx = np.arange(n)
+  upper = np.take(sums, np.minimum(idx + radius + 1, n), axis=axis)
+  lower = np.take(sums, np.maximum(idx - radius, 0), axis=axis)
+
+  return upper - lower > 0
+
+# labels every 4-connected region of open (0) cells in one pass, returning a
+# label grid (0 for walls, regions numbered from 1 in row-major order of their
+# first cell) and the size of every label; open runs of each row are merged
+# with the runs they overlap in the row above using union-find
+def label_regions(grid):
+  free = np.asarray(grid) == 0
+  rows, cols = free.shape
+
+  edges = np.zeros((rows, cols + 2), dtype=np.int8)
+  edges[:, 1:cols + 1] = free
+  edges = np.diff(edges, axis=1)
+  run_rows, run_starts = np.nonzero(edges == 1)
+  run_ends = np.nonzero(edges == -1)[1]
+  row_first = np.searchsorted(run_rows, np.arange(rows + 1)).tolist()
+  starts = run_starts.tolist()
+  ends = run_ends.tolist()
+
+  parent = list(range(len(starts)))
+
+  def find(i):
+    while parent[i] != i:
+      parent[i] = parent[parent[i]]
+      i = parent[i]
+    return i
+
+  for r in range(1, rows):
+    i, i_end = row_first[r - 1], row_first[r]
+    j, j_end = row_first[r], row_first[r + 1]
+    while i < i_end and j < j_end:
+      if starts[i] < ends[j] and starts[j] < ends[i]:
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+          parent[max(root_i, root_j)] = min(root_i, root_j)
+
+      if ends[i] < ends[j]:
+        i += 1
+      else:
+        j += 1
+
+  # number the regions in order of their first run
+  run_labels = np.empty(len(starts), dtype=np.int32)
+  root_labels = {}
+  for k in range(len(starts)):
+    run_labels[k] = root_labels.setdefault(find(k), len(root_labels) + 1)
+
+  # paint each run with its label, runs in a row never touch
+  steps = np.zeros((rows, cols + 1), dtype=np.int32)
+  steps[run_rows, run_starts] += run_labels
+  steps[run_rows, run_ends] -= run_labels
+  labels = np.cumsum(steps[:, :cols], axis=1, dtype=np.int32)
+
+  sizes = np.bincount(labels.ravel(), minlength=len(root_labels) + 1)
+  sizes[0] = 0
+
+  return labels, sizes
+
+# exact euclidean distance from every cell to the closest 1 cell, 0 on those
+# cells and inf everywhere if there are none; a column pass gives the vertical
+# distance to a wall, then a lower envelope of parabolas along each row
+# (Felzenszwalb & Huttenlocher) finds the closest one in O(rows * cols)
+def distance_transform(grid):
+  walls = np.asarray(grid) == 1
+  rows, cols = walls.shape
+
+  vertical = np.empty((rows, cols))
+  prev = np.full(cols, np.inf)
+  for r in range(rows):
+    prev = np.where(walls[r], 0.0, prev + 1)
+    vertical[r] = prev
+  prev = np.full(cols, np.inf)
+  for r in range(rows - 1, -1, -1):
+    prev = np.where(walls[r], 0.0, prev + 1)
+    vertical[r] = np.minimum(vertical[r], prev)
+
+  squared = vertical ** 2
+  for r in range(rows):
+    squared[r] = _lower_envelope(squared[r].tolist())
+
+  return np.sqrt(squared)
+
+# squared distance transform of one row of squared column distances
+def _lower_envelope(f):
+  n = len(f)
+  inf = float('inf')
+  parabolas = []
+  bounds = []
+  for q in range(n):
+    if f[q] == inf:
+      continue
+
+    s = -inf
+    while parabolas:
+      p = parabolas[-1]
+      s = ((f[q] + q * q) - (f[p] + p * p)) / (2.0 * (q - p))
+      if s <= bounds[-1]:
+        parabolas.pop()
+        bounds.pop()
+        s = -inf
+      else:
+        break
+
+    parabolas.append(q)
+    bounds.append(s)
+
+  if not parabolas:
+    return f
+
+  bounds.append(inf)
+  result = [0.0] * n
+  k = 0
+  for q in range(n):
+    while bounds[k + 1] < q:
+      k += 1
+    p = parabolas[k]
+    result[q] = (q - p) ** 2 + f[p]
+
+  return result
+
+# for a ray leaving every cell along axis (dr, dc), the number of open cells
+# it crosses before reaching a wall or the edge of the grid, and whether it
+# stops at a wall (True) or runs off the grid (False); computed with one sweep
+# that walks backwards along the axis, reusing the neighbor's result
+def run_lengths(grid, axis):
+  dr, dc = axis
+  if dr == 0:
+    runs, hits = run_lengths(np.asarray(grid).T, (dc, 0))
+    return runs.T, hits.T
+
+  free = np.asarray(grid) == 0
+  rows, cols = free.shape
+  runs = np.zeros((rows, cols), dtype=np.int32)
+  hits = np.zeros((rows, cols), dtype=bool)
+
+  order = range(rows - 1, -1, -1) if dr > 0 else range(rows)
+  for r in order:
+    if not 0 <= r + dr < rows:
+      continue
+
+    neighbor_free = _shift(free[r + dr], dc, False)
+    neighbor_wall = _shift(~free[r + dr], dc, False)
+    runs[r] = np.where(neighbor_free, _shift(runs[r + dr], dc, 0) + 1, 0)
+    hits[r] = np.where(neighbor_free, _shift(hits[r + dr], dc, False), neighbor_wall)
+
+  return runs, hits
+
+# row whose entry c is row[c + dc], fill where c + dc is off the row
+def _shift(row, dc, fill):
+  shifted = np.full(row.shape, fill, dtype=row.dtype)
+  if dc > 0:
+    shifted[:-dc] = row[dc:]
+  elif dc < 0:
+    shifted[-dc:] = row[:dc]
+  else:
+    shifted[:] = row
+
+  return shifted
+
+# for every ray in offset_table (a list of (dr, dc) cell offsets per ray),
+# whether any of its cells inside the grid is a wall, for all cells at once;
+# returns a (len(offset_table), rows, cols) boolean array
+def rays_hit_walls(grid, offset_table):
+  walls = np.asarray(grid) == 1
+  rows, cols = walls.shape
+  pad = max([max(abs(dr), abs(dc)) for offsets in offset_table for dr, dc in offsets] + [0])
+  padded = np.zeros((rows + 2 * pad, cols + 2 * pad), dtype=bool)
+  padded[pad:pad + rows, pad:pad + cols] = walls
+
+  hits = np.zeros((len(offset_table), rows, cols), dtype=bool)
+  for i, offsets in enumerate(offset_table):
+    for dr, dc in offsets:
+      hits[i] |= padded[pad + dr:pad + dr + rows, pad + dc:pad + dc + cols]
+
+  return hits
+
+# summed-area table of a grid, gives the sum of any window in O(1) per cell
+class IntegralImage():
+  def __init__(self, grid):
+    values = np.asarray(grid)
+    self.rows, self.cols = values.shape
+    self.table = np.zeros((self.rows + 1, self.cols + 1), dtype=np.int64)
+    self.table[1:, 1:] = values.cumsum(axis=0).cumsum(axis=1)
+
+  # sum over the (2 * radius + 1) square window around every cell, clipped to the grid
+  def windowSums(self, radius):
+    r_idx = np.arange(self.rows)
+    c_idx = np.arange(self.cols)
+    top = np.maximum(r_idx - radius, 0)[:, None]
+    bottom = np.minimum(r_idx + radius + 1, self.rows)[:, None]
+    left = np.maximum(c_idx - radius, 0)[None, :]
+    right = np.minimum(c_idx + radius + 1, self.cols)[None, :]
+
+    return self.table[bottom, right] - self.table[top, right] - self.table[bottom, left] + self.table[top, left]
+
+# covers the 1 cells of a grid with disjoint rectangles, returned as
+# (top, left, bottom, right) inclusive cell bounds; this is a greedy cover,
+# not a minimal one: each row's runs of 1s are extended downwards only for as
+# long as the row below has exactly the same run, so a run that is part of a
+# wider run below ends its rectangle there instead of growing further
+def cover_rectangles(grid):
+  filled = np.asarray(grid) == 1
+  rows, cols = filled.shape
+  edges = np.zeros((rows, cols + 2), dtype=np.int8)
+  edges[:, 1:cols + 1] = filled
+  edges = np.diff(edges, axis=1)
+
+  rectangles = []
+  # (left, right) of every run still growing, mapped to its top row
+  growing = {}
+  for r in range(rows):
+    runs = set(zip(np.flatnonzero(edges[r] == 1).tolist(), (np.flatnonzero(edges[r] == -1) - 1).tolist()))
+    for run in sorted(growing):
+      if run not in runs:
+        rectangles.append((growing.pop(run), run[0], r - 1, run[1]))
+    for run in sorted(runs):
+      if run not in growing:
+        growing[run] = r
+
+  for run in sorted(growing):
+    rectangles.append((growing[run], run[0], rows - 1, run[1]))
+
+  return rectangles
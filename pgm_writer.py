@@ -1,62 +1,66 @@
-import array
-import random
 import sys
+import numpy as np
 
-class PGMWriter():
-    def __init__(self, map, contain_wall_cylinders, filename):
-        self.map = map
-        self.rows = len(map)
-        self.cols = len(map[0]) + contain_wall_cylinders
-        self.contain_wall_cylinders = contain_wall_cylinders
-        self.filename = filename
 
-    def __call__(self):
+# pgm image rows for a stack of same-sized (n, rows, cols) maps: 3 rows of
+# open space, then the map columns from last to first, with the containment
+# wall columns in front of the map
+def pgmImages(maps, contain_wall_cylinders):
+    walls = np.asarray(maps) == 1
+    num, rows, map_cols = walls.shape
+    cols = map_cols + contain_wall_cylinders
+
+    full = np.full((num, rows, cols), 255, dtype=np.uint8)
+
+    # add the containment wall
+    if contain_wall_cylinders > 0:
+        full[:, 0, :contain_wall_cylinders] = 0
+        full[:, rows - 1, :contain_wall_cylinders] = 0
+        full[:, :, 0] = 0
 
-        # define the width  (columns) and height (rows) of your image
-        width = self.rows
-        height = self.cols + 3
+    # write the actual obstacles
+    full[:, :, contain_wall_cylinders:][walls] = 0
 
-        buff=array.array('B')
+    # add 3 extra columns of open space at the end
+    images = np.full((num, cols + 3, rows), 255, dtype=np.uint8)
+    images[:, 3:, :] = full.transpose(0, 2, 1)[:, ::-1, :]
 
-        # add 3 extra columns of open space at the end
-        for r in range(self.rows):
-            buff.append(255)
-            buff.append(255)
-            buff.append(255)
+    return images
 
-        # write the actual obstacles
-        for c in range(self.cols - 1, -1, -1):
-            for r in range(self.rows):
-                # add the containment wall
-                if c < self.contain_wall_cylinders:
-                    if r == 0 or r == self.rows - 1:
-                        buff.append(0)
-                    elif c == 0:
-                        buff.append(0)
-                    else:
-                        buff.append(255)
 
-                elif self.map[r][c - self.contain_wall_cylinders] == 1:
-                    buff.append(0)
-                else:
-                    buff.append(255)
+def writePGM(filename, image):
+    # open file for writing
+    try:
+        fout=open(filename, 'wb')
+    except IOError as er:
+        sys.exit()
 
+    # define PGM Header
+    height, width = image.shape
+    pgmHeader = 'P5' + '\n' + str(width) + '  ' + str(height) + '  ' + str(255) + '\n'
 
-        # open file for writing
-        try:
-            fout=open(self.filename, 'wb')
-        except IOError, er:
-            sys.exit()
+    # write the header and the data to the file
+    fout.write(pgmHeader.encode('ascii') + image.tobytes())
 
+    # close the file
+    fout.close()
 
-        # define PGM Header
-        pgmHeader = 'P5' + '\n' + str(width) + '  ' + str(height) + '  ' + str(255) + '\n'
 
-        # write the header to the file
-        fout.write(pgmHeader)
+# writes every map of a same-sized stack to the matching file name,
+# building all the images in one operation
+def writePGMs(maps, contain_wall_cylinders, filenames):
+    for image, filename in zip(pgmImages(maps, contain_wall_cylinders), filenames):
+        writePGM(filename, image)
 
-        # write the data to the file 
-        buff.tofile(fout)
 
-        # close the file
-        fout.close()
+class PGMWriter():
+    def __init__(self, map, contain_wall_cylinders, filename):
+        self.map = map
+        self.rows = len(map)
+        self.cols = len(map[0]) + contain_wall_cylinders
+        self.contain_wall_cylinders = contain_wall_cylinders
+        self.filename = filename
+
+    def __call__(self):
+        image = pgmImages([self.map], self.contain_wall_cylinders)[0]
+        writePGM(self.filename, image)
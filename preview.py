@@ -0,0 +1,186 @@
+import multiprocessing
+import os
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import grid_ops
+from dataset_store import DatasetReader
+from difficulty_quant import MapFeatures
+from gen_world_ca import jackal_radius
+
+# heatmaps a sheet can show per world, by MapFeatures grid name
+metric_titles = { "closestWall" : "Distance to\nclosest obstacle",
+                  "avgVisibility" : "Average visibility",
+                  "dispersion" : "Dispersion",
+                  "characteristic_dimension" : "Char dimension",
+                  "density" : "Density" }
+
+metric_cmaps = { "closestWall" : "RdYlGn",
+                 "avgVisibility" : "RdYlGn",
+                 "dispersion" : "RdYlGn",
+                 "characteristic_dimension" : "binary",
+                 "density" : "RdYlGn_r" }
+
+default_metrics = ["closestWall", "avgVisibility", "dispersion"]
+
+
+# obstacle map and c-space of a stored world with its path drawn in, the same
+# way gen_world_ca.showWorld draws them: 0.35 on the path, widened by the
+# robot radius in the obstacle map (the store's, or jackal_radius if it
+# didn't record one), and 0.65 on the start and goal
+def pathImages(world):
+  grid = np.array(world["grid"], dtype=float)
+  cspace = np.array(world["cspace"], dtype=float)
+  path = np.asarray(world["path"])
+  if len(path) == 0:
+    return grid, cspace
+
+  on_path = np.zeros(grid.shape, dtype=np.int8)
+  on_path[path[:, 0], path[:, 1]] = 1
+  cspace[on_path == 1] = 0.35
+  robot_radius = world.get("robot_radius")
+  if robot_radius is None:
+    robot_radius = jackal_radius
+  grid[grid_ops.dilate(on_path, robot_radius) == 1] = 0.35
+
+  for image in (grid, cspace):
+    image[path[0][0], 0] = 0.65
+    image[path[-1][0], image.shape[1] - 1] = 0.65
+
+  return grid, cspace
+
+
+# renders stored worlds off-screen into contact sheets, one row of panels per
+# world: obstacle map and path, c-space and path, then one heatmap per metric;
+# the figure, axes and images are built once and only their data is swapped
+# for every sheet
+class ContactSheet():
+  def __init__(self, grid_shape, worlds_per_sheet=8, metrics=None, radius=3, panel_inches=1.5, dpi=100):
+    self.worlds_per_sheet = worlds_per_sheet
+    self.metrics = metrics if metrics is not None else default_metrics
+    self.radius = radius
+    self.dpi = dpi
+
+    columns = 2 + len(self.metrics)
+    self.figure = Figure(figsize=(columns * panel_inches, worlds_per_sheet * panel_inches))
+    self.canvas = FigureCanvasAgg(self.figure)
+
+    blank = np.zeros(grid_shape)
+    titles = ["Map and A* path", "Jackal navigable map"] + [metric_titles[name] for name in self.metrics]
+    cmaps = ["Greys", "Greys"] + [metric_cmaps[name] for name in self.metrics]
+
+    # images[row][column], rows are worlds
+    self.axes = []
+    self.images = []
+    for row in range(worlds_per_sheet):
+      axes_row = []
+      images_row = []
+      for column in range(columns):
+        ax = self.figure.add_subplot(worlds_per_sheet, columns, row * columns + column + 1)
+        ax.get_xaxis().set_visible(False)
+        ax.get_yaxis().set_visible(False)
+        if row == 0:
+          ax.set_title(titles[column], fontsize="x-small")
+
+        images_row.append(ax.imshow(blank, cmap=cmaps[column], interpolation="nearest", vmin=0, vmax=1))
+        axes_row.append(ax)
+
+      # world number of the row
+      axes_row[0].get_yaxis().set_visible(True)
+      axes_row[0].set_yticks([])
+      axes_row[0].set_ylabel("", fontsize="x-small")
+      self.axes.append(axes_row)
+      self.images.append(images_row)
+
+  def _showWorld(self, row, world):
+    grid, cspace = pathImages(world)
+    features = MapFeatures(np.asarray(world["cspace"]), self.radius)
+
+    self.images[row][0].set_data(grid)
+    self.images[row][1].set_data(cspace)
+    for column, name in enumerate(self.metrics):
+      heatmap = np.asarray(getattr(features, name)(), dtype=float)
+      finite = heatmap[np.isfinite(heatmap)]
+      image = self.images[row][column + 2]
+      image.set_data(heatmap)
+      if len(finite) > 0:
+        image.set_clim(finite.min(), max(finite.max(), finite.min() + 1e-9))
+
+    self.axes[row][0].set_ylabel("world %d" % world["id"], fontsize="x-small")
+
+  # draws up to worlds_per_sheet worlds and saves the sheet to filename,
+  # rows without a world are hidden
+  def render(self, worlds, filename):
+    worlds = list(worlds)
+    if len(worlds) > self.worlds_per_sheet:
+      raise ValueError("%d worlds don't fit on a sheet of %d" % (len(worlds), self.worlds_per_sheet))
+
+    for row in range(self.worlds_per_sheet):
+      visible = row < len(worlds)
+      for ax in self.axes[row]:
+        ax.set_visible(visible)
+      if visible:
+        self._showWorld(row, worlds[row])
+
+    self.figure.savefig(filename, dpi=self.dpi)
+
+
+# per-process reader and sheet, set up once by _initWorker
+worker_reader = None
+worker_sheet = None
+
+def _initWorker(store_root, worlds_per_sheet, metrics, radius):
+  global worker_reader, worker_sheet
+  worker_reader = DatasetReader(store_root)
+  worker_sheet = ContactSheet(worker_reader.index["grid_shape"], worlds_per_sheet, metrics, radius)
+
+def _renderSheet(args):
+  positions, filename = args
+  worker_sheet.render([worker_reader.world(i) for i in positions], filename)
+  return filename
+
+
+# renders the worlds of a DatasetReader store at positions (all of them by
+# default, or e.g. the result of DatasetReader.select) into
+# out_dir/sheet_%05d.png, over workers processes when workers is set;
+# returns the sheet file names
+def renderStore(store_root, out_dir, positions=None, worlds_per_sheet=8, metrics=None, radius=3, workers=None):
+  if not os.path.isdir(out_dir):
+    os.makedirs(out_dir)
+
+  if positions is None:
+    positions = range(len(DatasetReader(store_root)))
+  positions = [int(i) for i in positions]
+
+  jobs = []
+  for start in range(0, len(positions), worlds_per_sheet):
+    filename = os.path.join(out_dir, "sheet_%05d.png" % len(jobs))
+    jobs.append((positions[start:start + worlds_per_sheet], filename))
+
+  init_args = (store_root, worlds_per_sheet, metrics, radius)
+  if workers:
+    pool = multiprocessing.Pool(workers, _initWorker, init_args)
+    filenames = pool.map(_renderSheet, jobs)
+    pool.close()
+    pool.join()
+  else:
+    _initWorker(*init_args)
+    filenames = [_renderSheet(job) for job in jobs]
+
+  return filenames
+
+
+if __name__ == "__main__":
+  import argparse
+
+  parser = argparse.ArgumentParser(description="render the worlds of a chunked dataset store into contact sheets")
+  parser.add_argument("store", help="store directory written by dataset_store.DatasetWriter")
+  parser.add_argument("out", help="directory for the sheet images")
+  parser.add_argument("--per-sheet", type=int, default=8, help="worlds per sheet")
+  parser.add_argument("--metrics", nargs="*", default=default_metrics, choices=sorted(metric_titles))
+  parser.add_argument("--radius", type=int, default=3, help="dispersion and density radius")
+  parser.add_argument("--workers", type=int, default=0, help="worker processes, 0 to render in this process")
+  args = parser.parse_args()
+
+  filenames = renderStore(args.store, args.out, None, args.per_sheet, args.metrics, args.radius, args.workers)
+  print("wrote %d sheets to %s" % (len(filenames), args.out))
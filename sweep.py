@@ -0,0 +1,178 @@
+import hashlib
+import math
+import multiprocessing
+import time
+import gen_world_ca
+
+# parameter sweep of the dataset: every fillPct is combined with every
+# smoothIter into a bucket, and each bucket needs quota accepted worlds
+default_spec = { "rows" : 30,
+                 "cols" : 30,
+                 "fillPct" : [0.15, 0.2, 0.25, 0.3, 0.35],
+                 "smoothIter" : [2, 3, 4],
+                 "quota" : 25 }
+
+
+# seed of candidate world index, derived from master_seed alone so any world
+# can be regenerated on its own with gen_world_ca.generateWorld
+def worldSeed(master_seed, index):
+  digest = hashlib.sha256(("%d:%d" % (master_seed, index)).encode("ascii")).hexdigest()
+  return int(digest[:15], 16)
+
+
+# runs in a pool worker, generates one candidate without writing anything
+# and returns it with the records of its path searches
+def _generateCandidate(args):
+  bucket_idx, index, seed, fillPct, smoothIter, rows, cols, num_pairs, max_expansions, max_seconds, relax_turns, repair = args
+  start = time.time()
+  search_stats = gen_world_ca.SearchStats(max_expansions, max_seconds, relax_turns)
+  world = gen_world_ca.generateWorld(seed, smoothIter, fillPct, rows, cols, num_pairs=num_pairs, search_stats=search_stats, repair=repair)
+  # the feature cache is only needed inside the worker
+  world.pop("features", None)
+
+  return bucket_idx, index, world, time.time() - start, search_stats.records
+
+
+# acceptance bookkeeping for one (fillPct, smoothIter) bucket
+class BucketStats():
+  def __init__(self, fillPct, smoothIter, quota, first_world):
+    self.fillPct = fillPct
+    self.smoothIter = smoothIter
+    self.quota = quota
+    self.first_world = first_world
+    self.saved = 0
+    # samples produced by accepted candidates, saved or not
+    self.samples = 0
+    # accepted candidates whose regions had to be connected
+    self.repaired = 0
+    # candidates and generation seconds by status
+    self.counts = {}
+    self.seconds = {}
+
+  def record(self, status, seconds):
+    self.counts[status] = self.counts.get(status, 0) + 1
+    self.seconds[status] = self.seconds.get(status, 0.0) + seconds
+
+  # samples an accepted candidate yields on average, num_pairs until one is seen
+  def samplesPerWorld(self, num_pairs):
+    accepted = self.counts.get("accepted", 0)
+    if accepted == 0:
+      return float(num_pairs)
+    return self.samples / float(accepted)
+
+  def finished(self):
+    return self.saved >= self.quota
+
+  # fraction of candidates accepted so far, with one accept and one reject
+  # assumed up front so an unseen bucket starts at 0.5
+  def acceptanceRate(self):
+    evaluated = sum(self.counts.values())
+    return (self.counts.get("accepted", 0) + 1.0) / (evaluated + 2.0)
+
+  def report(self):
+    evaluated = sum(self.counts.values())
+    total_seconds = sum(self.seconds.values())
+    line = "fillPct %.2f smooths %d: %d/%d saved, %d candidates, acceptance %.3f" % (
+        self.fillPct, self.smoothIter, self.saved, self.quota, evaluated,
+        self.counts.get("accepted", 0) / max(float(evaluated), 1.0))
+    for status in sorted(self.counts):
+      line += ", %s %d (%.1fs)" % (status, self.counts[status], self.seconds[status])
+    if self.repaired > 0:
+      line += ", %d repaired" % self.repaired
+    if total_seconds > 0:
+      line += ", %.0f%% of time on rejects" % (100.0 * (total_seconds - self.seconds.get("accepted", 0.0)) / total_seconds)
+
+    return line
+
+
+# generates a dataset from a sweep spec like default_spec over a process pool,
+# running every unfinished bucket in each round and launching as many
+# candidates for it as its acceptance rate so far says are needed to fill its
+# quota, times overshoot; num_pairs saves up to that many start and goal
+# pairs of every accepted candidate as separate worlds; round sizes depend
+# only on earlier results and worlds are numbered by bucket and candidate
+# order, so the output is the same for any number of workers
+# max_expansions and max_seconds bound every path search, see
+# gen_world_ca.SearchStats; with max_seconds the output also depends on how
+# fast the searches run; relax_turns retries them without the turn limit
+# repair connects disconnected maps instead of rejecting them, see
+# gen_world_ca.generateWorld
+# first_world is the number of the first world saved, e.g. one past the
+# last world of a store being added to, in which case seed_file is appended
+# to instead of rewritten; a different master_seed keeps the new maps from
+# repeating the ones already there
+class SweepScheduler():
+  def __init__(self, spec=None, master_seed=0, workers=None, overshoot=1.25, max_round=512, seed_file="dataset/world_seeds.txt", num_pairs=1,
+               max_expansions=None, max_seconds=None, repair=False, relax_turns=False, first_world=0):
+    self.spec = spec if spec is not None else default_spec
+    self.master_seed = master_seed
+    self.workers = workers
+    self.num_pairs = num_pairs
+    self.repair = repair
+    self.search_stats = gen_world_ca.SearchStats(max_expansions, max_seconds, relax_turns)
+    self.overshoot = overshoot
+    self.max_round = max_round
+    self.seed_file = seed_file
+    self.first_world = first_world
+    self.rounds = 0
+
+    # bucket b owns world numbers first_world + b * quota to
+    # first_world + (b + 1) * quota - 1
+    quota = self.spec["quota"]
+    self.buckets = []
+    for fillPct in self.spec["fillPct"]:
+      for smoothIter in self.spec["smoothIter"]:
+        self.buckets.append(BucketStats(fillPct, smoothIter, quota, first_world + len(self.buckets) * quota))
+
+  # candidates to launch for a bucket this round
+  def _roundSize(self, bucket):
+    needed = (bucket.quota - bucket.saved) / (bucket.acceptanceRate() * bucket.samplesPerWorld(self.num_pairs)) * self.overshoot
+    return int(min(max(math.ceil(needed), 1), self.max_round))
+
+  def run(self, save=gen_world_ca.saveWorld):
+    pool = multiprocessing.Pool(self.workers)
+    candidate = 0
+
+    with open(self.seed_file, "a" if self.first_world > 0 else "w") as seeds:
+      while not all(bucket.finished() for bucket in self.buckets):
+        self.rounds += 1
+        jobs = []
+        for bucket_idx, bucket in enumerate(self.buckets):
+          if bucket.finished():
+            continue
+
+          size = self._roundSize(bucket)
+          for n in range(size):
+            seed = worldSeed(self.master_seed, candidate)
+            jobs.append((bucket_idx, candidate, seed, bucket.fillPct, bucket.smoothIter, self.spec["rows"], self.spec["cols"], self.num_pairs,
+                       self.search_stats.max_expansions, self.search_stats.max_seconds, self.search_stats.relax_turns, self.repair))
+            candidate += 1
+
+        for bucket_idx, index, world, seconds, searches in pool.imap(_generateCandidate, jobs):
+          self.search_stats.merge(searches)
+          bucket = self.buckets[bucket_idx]
+          bucket.record(world["status"], seconds)
+          if world["status"] != "accepted":
+            continue
+
+          # the seed file line of a world also names its pair on the map
+          bucket.samples += len(world["samples"])
+          if world["repaired_cells"] > 0:
+            bucket.repaired += 1
+          for pair, sample in enumerate(gen_world_ca.worldSamples(world)):
+            if bucket.finished():
+              break
+
+            iteration = bucket.first_world + bucket.saved
+            save(iteration, sample)
+            seeds.write("%d %d %d %r %d %d\n" % (iteration, index, world["seed"], bucket.fillPct, bucket.smoothIter, pair))
+            bucket.saved += 1
+
+        print("round %d: %d candidates" % (self.rounds, len(jobs)))
+        print(self.report())
+
+    pool.close()
+    pool.join()
+
+  def report(self):
+    return "\n".join([bucket.report() for bucket in self.buckets] + [self.search_stats.report()])
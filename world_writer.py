@@ -1,20 +1,30 @@
-# define boilerplate code needed to write to .world file
-with open("./world-boilerplate/world_boiler_start.txt") as f:
-      world_boiler_start = f.read()
-with open("./world-boilerplate/world_boiler_mid.txt") as f:
-      world_boiler_mid = f.read()
-with open("./world-boilerplate/world_boiler_end.txt") as f:
-      world_boiler_end = f.read()
-with open("./world-boilerplate/cylinder_define.txt") as f:
-      cylinder_define = f.read()
-with open("./world-boilerplate/cylinder_place.txt") as f:
-      cylinder_place = f.read()
+import os
+import numpy as np
+import grid_ops
+
+# boilerplate code needed to write to .world file, read from world-boilerplate
+# next to this module on first use
+boilerplate_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "world-boilerplate")
+boilerplate = {}
+
+def loadBoilerplate(name):
+  if name not in boilerplate:
+    with open(os.path.join(boilerplate_dir, name + ".txt")) as f:
+      boilerplate[name] = f.read()
+
+  return boilerplate[name]
 
 
 class WorldWriter():
 
-  def __init__(self, filename, map, cyl_radius, contain_wall_length):
-    self.file = open(filename, "w")
+  # compact replaces the cylinders with static box models: one per
+  # containment wall and one per rectangle of a greedy cover of the obstacle
+  # cells (see grid_ops.cover_rectangles), each box spanning the cylinders it
+  # replaces
+  def __init__(self, filename, map, cyl_radius, contain_wall_length, compact=False):
+    self.filename = filename
+    self.compact = compact
+    self.numBoxes = 0
     self.map = map
     self.numCylinders = 0
     self.cylinderList = []
@@ -24,94 +34,120 @@ class WorldWriter():
     self.contain_wall_length = contain_wall_length
 
   def __call__(self):
-    # write .world boilerplate at start
-    self._writeStarterBoiler()
-
     c_lower = self.cyl_radius
     c_upper = self.cyl_radius + self.contain_wall_length
     r_lower = -self.cyl_radius
     r_upper = self.r_shift - self.cyl_radius
+    self.cylinderList = []
+    self.numCylinders = 0
 
     # create the back containment wall
     r_coord = r_lower
     while r_coord >= r_upper:
-      self._createCylinder(r_coord, c_lower, 0, 0, 0, 0, radius=self.cyl_radius)
+      self._createCylinder(r_coord, c_lower, 0, 0, 0, 0)
       r_coord -= self.cyl_radius * 2
+    num_back = len(self.cylinderList)
 
     # create the upper and lower containment walls
     c_coord = c_lower + self.cyl_radius * 2
     while c_coord <= c_upper:
-      self._createCylinder(r_lower, c_coord, 0, 0, 0, 0, radius=self.cyl_radius)
-      self._createCylinder(r_upper, c_coord, 0, 0, 0, 0, radius=self.cyl_radius)
+      self._createCylinder(r_lower, c_coord, 0, 0, 0, 0)
+      self._createCylinder(r_upper, c_coord, 0, 0, 0, 0)
       c_coord += self.cyl_radius * 2
 
-
     # define all cylinders in the actual obstacle field
     c_lower = c_coord
-    for r in range(len(self.map)):
-      for c in range(len(self.map[0])):
-        if self.map[r][c] == 1 and not self._allNeighborsFilled(r, c):
-          self._createCylinder(r_upper + r * self.cyl_radius * 2, c_lower + c * self.cyl_radius * 2, 0, 0, 0, 0, radius=self.cyl_radius)
-
-
-    # write .world middle boilerplate
-    self._writeMidBoiler()
-
-    # place cylinders
-    self._placeCylinders()
-
-    # write .world end boilerplate
-    self._writeEndBoiler()
-
-    # close file
-    self._close()
+    wall_cylinders = np.asarray(self.cylinderList, dtype=float).reshape(-1, 6)
+    rows, cols = np.nonzero(self._boundaryWalls())
+    obstacles = np.zeros((len(rows), 6))
+    obstacles[:, 0] = r_upper + rows * self.cyl_radius * 2
+    obstacles[:, 1] = c_lower + cols * self.cyl_radius * 2
+    cylinders = np.concatenate((wall_cylinders, obstacles))
+
+    self.cylinderList = cylinders.tolist()
+    self.numCylinders = len(cylinders)
+
+    if self.compact:
+      boxes = np.concatenate((self._containWallBoxes(wall_cylinders, num_back), self._obstacleBoxes(r_upper, c_lower)))
+      self.numBoxes = len(boxes)
+      print("Compacted %d cylinders into %d boxes" % (self.numCylinders, self.numBoxes))
+      defines = self._renderBoxDefines(boxes)
+      placements = self._renderPlacements(boxes[:, :6], "box_place")
+    else:
+      defines = self._renderDefines(cylinders)
+      placements = self._renderPlacements(cylinders)
+
+    # render every section and write the whole file at once
+    with open(self.filename, "w") as f:
+      f.write("".join([
+        loadBoilerplate("world_boiler_start"),
+        defines,
+        loadBoilerplate("world_boiler_mid"),
+        placements,
+        loadBoilerplate("world_boiler_end"),
+      ]))
 
     contain_wall_cylinders = self.contain_wall_length / (self.cyl_radius * 2)
     return int(contain_wall_cylinders)
 
-  # returns true if all 8 spaces around (r, c) are filled, false otherwise
-  def _allNeighborsFilled(self, r, c):
-    for r_neigh in range(r-1, r+2):
-      for c_neigh in range(c-1, c+2):
-        if r_neigh < 0 or r_neigh >= len(self.map) or c_neigh < 0 or c_neigh >= len(self.map[0]):
-          return False
+  # wall cells that don't have all 8 neighbors filled, cells on the edge of
+  # the map always count as having an open neighbor
+  def _boundaryWalls(self):
+    walls = np.asarray(self.map) == 1
+    rows, cols = walls.shape
+    padded = np.zeros((rows + 2, cols + 2), dtype=bool)
+    padded[1:rows + 1, 1:cols + 1] = walls
 
-        if self.map[r_neigh][c_neigh] == 0:
-          return False
+    surrounded = np.ones((rows, cols), dtype=bool)
+    for dr in range(3):
+      for dc in range(3):
+        surrounded &= padded[dr:dr + rows, dc:dc + cols]
 
-    return True
+    return walls & ~surrounded
 
-  def _writeStarterBoiler(self):
-    self.file.write(world_boiler_start)
-
-  def _createCylinder(self, pos_x, pos_y, pos_z, rot_a, rot_b, rot_c, radius):
-    self.file.write(cylinder_define % (
-        self.numCylinders, pos_x, pos_y, pos_z, rot_a, rot_b, rot_c, radius, radius
-    ))
-    self.file.write("\n")
-    
+  def _createCylinder(self, pos_x, pos_y, pos_z, rot_a, rot_b, rot_c):
     self.cylinderList.append([pos_x, pos_y, pos_z, rot_a, rot_b, rot_c])
     self.numCylinders += 1
 
-  def _writeMidBoiler(self):
-      self.file.write(world_boiler_mid)
-
-  def _placeCylinders(self):
-    for i in range(self.numCylinders):
-      self.file.write(cylinder_place % (
-          i, self.cylinderList[i][0], self.cylinderList[i][1], self.cylinderList[i][2], 
-          self.cylinderList[i][3], self.cylinderList[i][4], self.cylinderList[i][5], 
-          self.cylinderList[i][0], self.cylinderList[i][1], self.cylinderList[i][2], 
-          self.cylinderList[i][3], self.cylinderList[i][4], self.cylinderList[i][5], 
-      ))
-      self.file.write("\n")
-
-  def _writeEndBoiler(self):
-    self.file.write(world_boiler_end)
-
-  def _close(self):
-    self.file.close()
+  # model definitions of every cylinder, one per line
+  def _renderDefines(self, cylinders):
+    cylinder_define = loadBoilerplate("cylinder_define") + "\n"
+    radius = self.cyl_radius
+    return "".join([cylinder_define % ((i,) + tuple(pose) + (radius, radius)) for i, pose in enumerate(cylinders.tolist())])
+
+  # model states placing every model, one per line
+  def _renderPlacements(self, poses, template="cylinder_place"):
+    place = loadBoilerplate(template) + "\n"
+    return "".join([place % ((i,) + tuple(pose) + tuple(pose)) for i, pose in enumerate(poses.tolist())])
+
+  # box models as rows of pose (6) and x, y size
+  def _renderBoxDefines(self, boxes):
+    box_define = loadBoilerplate("box_define") + "\n"
+    return "".join([box_define % ((i,) + tuple(box) + (box[6], box[7])) for i, box in enumerate(boxes.tolist())])
+
+  # box around a straight line of touching cylinders given by their poses
+  def _lineBox(self, poses):
+    lower = poses[:, :2].min(axis=0)
+    upper = poses[:, :2].max(axis=0)
+    center = (lower + upper) / 2
+    size = upper - lower + self.cyl_radius * 2
+    return [center[0], center[1], 0, 0, 0, 0, size[0], size[1]]
+
+  # one box for the back wall and one each for the lower and upper walls,
+  # the first num_back cylinders are the back wall and the side walls alternate after it
+  def _containWallBoxes(self, wall_cylinders, num_back):
+    walls = [wall_cylinders[:num_back], wall_cylinders[num_back::2], wall_cylinders[num_back + 1::2]]
+    return np.asarray([self._lineBox(wall) for wall in walls if len(wall) > 0], dtype=float).reshape(-1, 8)
+
+  # one box per rectangle covering the obstacle cells
+  def _obstacleBoxes(self, r_upper, c_lower):
+    diameter = self.cyl_radius * 2
+    boxes = []
+    for top, left, bottom, right in grid_ops.cover_rectangles(self.map):
+      boxes.append([r_upper + (top + bottom) * diameter / 2, c_lower + (left + right) * diameter / 2, 0, 0, 0, 0,
+                    (bottom - top + 1) * diameter, (right - left + 1) * diameter])
+
+    return np.asarray(boxes, dtype=float).reshape(-1, 8)
 
   def getShifts(self):
     return self.r_shift, self.c_shift
-   